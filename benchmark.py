@@ -0,0 +1,372 @@
+"""
+
+benchmark.py
+Written by: William Lin
+
+Description:
+Benchmarks for Bowling Score Tracker
+
+    usage: 'python benchmark.py startup <opt: runs> <opt: limit ms>'
+        Times a cold import of the CLI in a fresh interpreter. Exits with 1 if the median is above the limit, so
+        startup regressions fail a check instead of going unnoticed.
+    usage: 'python benchmark.py suite <opt: sizes> <opt: output file>'
+        Times scoring, validation, rendering and Interface entry/read cycles over seeded synthetic games, at each
+        of the comma separated sizes (default 1000,100000,1000000). Results are written as JSON (default
+        'benchmark.json') to be compared between releases.
+
+"""
+
+from bowling import Interface
+from bowling import Game
+from bowling import GameUtils
+from bowling import DATA_COLUMNS
+from maincli import print_game_results
+
+import json
+import platform
+from contextlib import redirect_stdout
+from datetime import date as t_date
+from datetime import datetime
+from datetime import timedelta
+from os import devnull
+from os.path import join
+from random import Random
+from statistics import median
+from subprocess import run
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from time import perf_counter_ns
+
+STARTUP_MODULE = "maincli"
+STARTUP_RUNS = 10
+# Modules the CLI must not import before its prompt, they are loaded when their backend is used
+STARTUP_DEFERRED = ("mariadb", "googleapiclient", "google_auth_oauthlib", "dateutil", "dotenv", "numpy", "sqlite3")
+
+SUITE_SIZES = (1000, 100000, 1000000)
+SUITE_OUTPUT = "benchmark.json"
+SUITE_SEED = 2023
+SUITE_CHUNK_SIZE = 10000  # Games generated and timed at a time, bounds memory at any size
+ENTRY_GAMES = 1000  # Games entered and read through Interface on top of the games loaded at each size
+GAMES_PER_DAY = 6
+
+STRIKE_RATE = 0.3
+SPARE_RATE = 0.4  # Chance of converting a leave
+FIRST_BALL_WEIGHTS = (1, 1, 1, 2, 3, 5, 8, 14, 20, 15)  # Pins on a first ball that is not a strike
+
+
+class GameGenerator:
+    """
+        Seeded source of realistic games: strikes, spares and opens at league-like rates and valid tenth frames.
+        The same seed always produces the same games.
+    """
+    def __init__(self, seed: int = SUITE_SEED):
+        self.random = Random(seed)
+
+    def ball(self, pins: int) -> int:
+        """
+            Pins knocked down by a ball thrown at `pins` standing pins
+        """
+        if pins == 10:
+            if self.random.random() < STRIKE_RATE:
+                return 10
+            return self.random.choices(range(10), FIRST_BALL_WEIGHTS)[0]
+
+        if self.random.random() < SPARE_RATE:
+            return pins
+        return self.random.randint(0, pins - 1)
+
+    def throws(self) -> list[int | None]:
+        """
+            Returns a complete game as its 21 throws, ordered as THROW_COLUMNS
+        """
+        throws = []
+        for _ in range(9):
+            first = self.ball(10)
+            throws += [10, None] if first == 10 else [first, self.ball(10 - first)]
+
+        first = self.ball(10)
+        if first == 10:
+            second = self.ball(10)
+            third = self.ball(10 if second == 10 else 10 - second)
+        else:
+            second = self.ball(10 - first)
+            third = self.ball(10) if first + second == 10 else None
+
+        return throws + [first, second, third]
+
+    def rows(self, count: int, start: t_date = t_date(1970, 1, 1), games_per_day: int = GAMES_PER_DAY):
+        """
+            Yields `count` games as `data` table rows, `games_per_day` games a day from `start`
+        """
+        for i in range(count):
+            throws = self.throws()
+            scores = GameUtils.accumulate_scores(GameUtils.calc_frame_scores([throw or 0 for throw in throws]))
+
+            yield (start + timedelta(days=i // games_per_day), i % games_per_day + 1) + tuple(throws) + tuple(scores)
+
+    def chunks(self, count: int, chunk_size: int = SUITE_CHUNK_SIZE, **kwargs):
+        rows = self.rows(count, **kwargs)
+        for first in range(0, count, chunk_size):
+            yield [next(rows) for _ in range(min(chunk_size, count - first))]
+
+
+def to_symbols(throws: list[int | None]) -> list[tuple[str, int]]:
+    """
+        Returns the (input, pins standing) pairs a player would type to enter a game, as read by score_to_num
+    """
+    def symbol(value: int, pins: int) -> str:
+        if value == 10 and pins == 10:
+            return "x"
+        if value == pins:
+            return "/"
+        return str(value) if value else "-"
+
+    symbols = []
+    for i in range(0, 18, 2):
+        symbols.append((symbol(throws[i], 10), 10))
+        if throws[i] != 10:
+            symbols.append((symbol(throws[i + 1], 10 - throws[i]), 10 - throws[i]))
+
+    first, second, third = throws[18:21]
+    pins = 10 if first == 10 else 10 - first
+    symbols += [(symbol(first, 10), 10), (symbol(second, pins), pins)]
+    if third is not None:
+        pins = 10 if first + second in (10, 20) else 10 - second
+        symbols.append((symbol(third, pins), pins))
+
+    return symbols
+
+
+def to_frames(throws: list[int | None], typed: bool = False) -> list[tuple[int, list[int]]]:
+    """
+        Returns the (frame, throws) pairs of a game as passed to verify_frame, missing throws as 0, or if `typed`
+        as passed to GameSession.add_frame by the CLI, without the throws that were not bowled
+    """
+    frames = [(frame, throws[(frame - 1) * 2:(frame - 1) * 2 + 2]) for frame in range(1, 10)] + [(10, throws[18:21])]
+
+    if typed:
+        return [(frame, [throw for throw in frame_throws if throw is not None]) for frame, frame_throws in frames]
+    return [(frame, [throw or 0 for throw in frame_throws]) for frame, frame_throws in frames]
+
+
+def result(name: str, games: int, operations: int, elapsed_ns: int) -> dict:
+    return {
+        "name": name,
+        "games": games,
+        "operations": operations,
+        "seconds": elapsed_ns / 1e9,
+        "ns_per_op": elapsed_ns / operations if operations else 0.0,
+    }
+
+
+def bench_scoring(games: int, seed: int = SUITE_SEED) -> list[dict]:
+    """
+        Times GameUtils.calc_frame_scores, accumulate_scores, score_to_num and verify_frame and the rendering of
+        print_game_results over `games` generated games
+    """
+    elapsed = dict.fromkeys(("calc_frame_scores", "accumulate_scores", "score_to_num", "verify_frame",
+                             "print_game_results"), 0)
+    operations = dict.fromkeys(elapsed, 0)
+    calc_frame_scores, accumulate_scores = GameUtils.calc_frame_scores, GameUtils.accumulate_scores
+    score_to_num, verify_frame = GameUtils.score_to_num, GameUtils.verify_frame
+
+    with open(devnull, "w") as sink:
+        for rows in GameGenerator(seed).chunks(games):
+            throws = [[throw or 0 for throw in row[2:23]] for row in rows]
+            symbols = [pair for row in rows for pair in to_symbols(row[2:23])]
+            frames = [pair for row in rows for pair in to_frames(row[2:23])]
+            loaded = [Game.from_row(row) for row in rows]
+
+            start = perf_counter_ns()
+            frame_scores = [calc_frame_scores(game_throws) for game_throws in throws]
+            elapsed["calc_frame_scores"] += perf_counter_ns() - start
+
+            start = perf_counter_ns()
+            for game_scores in frame_scores:
+                accumulate_scores(game_scores)
+            elapsed["accumulate_scores"] += perf_counter_ns() - start
+
+            start = perf_counter_ns()
+            for symbol, pins in symbols:
+                score_to_num(symbol, pins)
+            elapsed["score_to_num"] += perf_counter_ns() - start
+
+            start = perf_counter_ns()
+            for frame, frame_throws in frames:
+                verify_frame(frame, frame_throws)
+            elapsed["verify_frame"] += perf_counter_ns() - start
+
+            start = perf_counter_ns()
+            with redirect_stdout(sink):
+                print_game_results(loaded)
+            elapsed["print_game_results"] += perf_counter_ns() - start
+
+            operations["calc_frame_scores"] += len(rows)
+            operations["accumulate_scores"] += len(rows)
+            operations["score_to_num"] += len(symbols)
+            operations["verify_frame"] += len(frames)
+            operations["print_game_results"] += len(rows)
+
+    return [result(name, games, operations[name], elapsed[name]) for name in elapsed]
+
+
+def bench_interface(games: int, entries: int = ENTRY_GAMES, seed: int = SUITE_SEED) -> list[dict]:
+    """
+        Loads `games` generated games into an embedded SQLite database standing in for MariaDB, then times
+        `entries` games entered frame by frame through GameSession and read back through Interface.get_game.
+        The entry and read samples have the same size at every `games`, so their timings show how they scale with
+        the size of the database.
+    """
+    generator = GameGenerator(seed)
+    results = []
+
+    with TemporaryDirectory() as directory:
+        instance = Interface(None, None, join(directory, "benchmark.db"), None, None, backend="sqlite")
+        if not instance.valid:
+            raise RuntimeError(f"Failed to open the benchmark database: {instance.err}")
+
+        elapsed = 0
+        for rows in generator.chunks(games):
+            start = perf_counter_ns()
+            instance.interface.upsert_rows("data", DATA_COLUMNS, rows)
+            elapsed += perf_counter_ns() - start
+        start = perf_counter_ns()
+        instance.rebuild_summary()
+        results.append(result("interface_load", games, games, elapsed + perf_counter_ns() - start))
+
+        first_day = t_date(1970, 1, 1) + timedelta(days=games // GAMES_PER_DAY + 1)
+        entered = [(str(first_day + timedelta(days=i // GAMES_PER_DAY)), to_frames(generator.throws(), typed=True))
+                   for i in range(entries)]
+
+        start = perf_counter_ns()
+        for date, frames in entered:
+            session = instance.new_session(date)
+            for frame, frame_score in frames:
+                session.add_frame(frame, frame_score)
+            session.finish()
+        results.append(result("interface_entry", games, entries, perf_counter_ns() - start))
+
+        days = games // GAMES_PER_DAY + 1
+        keys = [(str(t_date(1970, 1, 1) + timedelta(days=generator.random.randrange(days))),
+                 generator.random.randint(1, GAMES_PER_DAY)) for _ in range(entries)]
+        instance.cache.clear()
+        for name in ("interface_read", "interface_read_cached"):
+            start = perf_counter_ns()
+            for date, game in keys:
+                instance.get_game(date, game)
+            results.append(result(name, games, len(keys), perf_counter_ns() - start))
+
+        start = perf_counter_ns()
+        for date, _ in keys:
+            instance.get_game(date)
+        results.append(result("interface_read_date", games, len(keys), perf_counter_ns() - start))
+
+        instance.close()
+
+    return results
+
+
+def bench_suite(sizes: tuple[int, ...] = SUITE_SIZES, seed: int = SUITE_SEED, progress=None) -> dict:
+    """
+        Runs every benchmark at each size. Returns the results with the environment they were measured in.
+    """
+    results = []
+    for games in sizes:
+        for bench in (bench_scoring, bench_interface):
+            results += bench(games, seed=seed)
+            if progress:
+                progress(results)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "sizes": list(sizes),
+        "results": results,
+    }
+
+
+def bench_startup(module: str = STARTUP_MODULE, runs: int = STARTUP_RUNS) -> dict:
+    """
+        Imports `module` in `runs` fresh interpreters. Returns the timings in milliseconds and the deferred modules
+        that were imported anyway.
+    """
+    check = f"import sys, {module}; print(','.join(m for m in {STARTUP_DEFERRED!r} if m in sys.modules))"
+    run([executable, "-c", check], check=True, capture_output=True)  # Warm up, writes bytecode caches
+
+    timings = []
+    loaded = ""
+    for _ in range(runs):
+        start = perf_counter()
+        result = run([executable, "-c", check], check=True, capture_output=True, text=True)
+        timings.append((perf_counter() - start) * 1000)
+        loaded = result.stdout.strip()
+
+    start = perf_counter()
+    for _ in range(runs):
+        run([executable, "-c", "pass"], check=True)
+    baseline = (perf_counter() - start) * 1000 / runs
+
+    return {
+        "module": module,
+        "runs": runs,
+        "min_ms": min(timings),
+        "median_ms": median(timings),
+        "interpreter_ms": baseline,
+        "import_ms": median(timings) - baseline,
+        "eager_modules": loaded.split(",") if loaded else [],
+    }
+
+
+def print_result(entry: dict):
+    print(f"{entry['name']:<24}{entry['games']:>10} games {entry['operations']:>12} ops "
+          f"{entry['seconds']:>10.3f} s {entry['ns_per_op']:>12.0f} ns/op")
+
+
+def main(args):
+    if len(args) < 2 or args[1] not in ("startup", "suite"):
+        print("usage: 'python benchmark.py startup <opt: runs> <opt: limit ms>'")
+        print("usage: 'python benchmark.py suite <opt: sizes> <opt: output file>'")
+        return 1
+
+    if args[1] == "suite":
+        sizes = tuple(int(size) for size in args[2].split(",")) if len(args) > 2 else SUITE_SIZES
+        output = args[3] if len(args) > 3 else SUITE_OUTPUT
+
+        printed = 0
+
+        def progress(results: list[dict]):
+            nonlocal printed
+            for entry in results[printed:]:
+                print_result(entry)
+            printed = len(results)
+
+        report = bench_suite(sizes, progress=progress)
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Wrote {len(report['results'])} results to '{output}'")
+        return 0
+
+    runs = int(args[2]) if len(args) > 2 else STARTUP_RUNS
+    limit = float(args[3]) if len(args) > 3 else None
+
+    result = bench_startup(runs=runs)
+    print(f"{result['module']}: median {result['median_ms']:.1f} ms, min {result['min_ms']:.1f} ms "
+          f"({result['import_ms']:.1f} ms over a bare interpreter, {runs} runs)")
+    if result["eager_modules"]:
+        print(f"Imported at startup: {', '.join(result['eager_modules'])}")
+
+    if result["eager_modules"] or (limit is not None and result["median_ms"] > limit):
+        print("Startup regression")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    from sys import argv
+
+    exit(main(argv))
@@ -8,59 +8,524 @@ Interface to Bowling Score Tracker in Google Sheets. Utilizes StorageInterfaces.
 
 """
 
-from storageinterface import MariaDBInterface
+from storageinterface import MariaDBPool
+from storageinterface import OfflineInterface
 from storageinterface import GoogleSheetInterface
 from storageinterface import InterfaceError
+from storageinterface import QueryStats
+from storageinterface import get_backend
+from bowlingstats import SUMMARY_SCHEMA
+from bowlingstats import Statistics
+from bowlingstats import Summary
 
+from array import array
+from collections import OrderedDict
 from datetime import datetime as t_datetime
 from datetime import date as t_date
-from dateutil.parser import parse as parse_date
-from dateutil.parser import parserinfo
+from datetime import timedelta
+from functools import lru_cache
+from threading import Event
+from threading import Lock
+from threading import RLock
+from threading import Thread
+from time import monotonic
+
+
+THROW_COLUMNS = tuple(f"f{frame}_{throw}" for frame in range(1, 10) for throw in (1, 2)) + ("f10_1", "f10_2", "f10_3")
+SCORE_COLUMNS = tuple(f"f{frame}_s" for frame in range(1, 11))
+DATA_COLUMNS = ("date", "game") + THROW_COLUMNS + SCORE_COLUMNS
+INDEX_COLUMNS = ("date", "games", "checksum")
+INDEX_TOTAL = "all"  # Backup index row covering every game in the backup
+
+# Order-independent fingerprint of a group of games, simple enough for a Sheets formula to compute too:
+# (games, sum over the games of game number * weighted sum of its cells, an empty cell counting 0, others value + 1)
+CHECKSUM_COLUMNS = ("game",) + THROW_COLUMNS + SCORE_COLUMNS
+FINGERPRINT = ("COUNT(*)", "COALESCE(SUM(game * (" + " + ".join(
+    f"{weight} * COALESCE({column} + 1, 0)" for weight, column in enumerate(CHECKSUM_COLUMNS, start=1)
+) + ")), 0)")
+GAME_CACHE_SIZE = 1024  # Games kept by Interface's game cache
+GAME_CACHE_TTL = 30.0  # Seconds a cached game is served before being read again
+DATE_LIST_CACHE_SIZE = 64  # Dates whose game lists are kept
+DATE_CACHE_SIZE = 4096  # Parsed dates kept by DateUtils
+ARCHIVE_CHUNK_SIZE = 10000  # Games read and packed at a time when exporting an archive
+IMPORT_CHUNK_SIZE = 1000  # Rows per transaction when importing a CSV file
+REPLAY_BATCH_SIZE = 1000  # Games queued for sync per transaction
+SAVE_ATTEMPTS = 3  # Game numbers tried by a session whose number was taken by another client
+GAME_COUNT_TTL = 2.0  # Seconds a date's game counts are trusted before being counted again, other clients may write
+
+DATA_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS data ("
+    "date DATE NOT NULL, "
+    "game SMALLINT UNSIGNED NOT NULL, "
+    + "".join(f"{column} TINYINT UNSIGNED NULL, " for column in THROW_COLUMNS)
+    + "".join(f"{column} SMALLINT UNSIGNED NULL, " for column in SCORE_COLUMNS)
+    + "PRIMARY KEY (date, game)"
+    ")"
+)
+DATA_INDEX = "CREATE INDEX IF NOT EXISTS data_score ON data (f10_s, date)"
+# Games waiting to be replicated to the backup. Repeated changes to a game share one entry, `version` counts them.
+SYNC_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sync_queue ("
+    "date DATE NOT NULL, "
+    "game SMALLINT UNSIGNED NOT NULL, "
+    "queued TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+    "version INT UNSIGNED NOT NULL DEFAULT 0, "
+    "PRIMARY KEY (date, game)"
+    ")"
+)
+SYNC_INDEX = "CREATE INDEX IF NOT EXISTS sync_queued ON sync_queue (queued)"
+# Created when an embedded database is opened, MariaDB is set up by setup.py
+SQLITE_SCHEMA = (DATA_SCHEMA, DATA_INDEX) + SUMMARY_SCHEMA + (SYNC_SCHEMA, SYNC_INDEX)
+
+# Replay of the offline journal: games created offline are only inserted, games changed offline overwrite the server's
+REPLAY_INSERT = f"INSERT INTO data ({', '.join(DATA_COLUMNS)}) VALUES ({', '.join('?' * len(DATA_COLUMNS))})"
+REPLAY_UPDATE = REPLAY_INSERT + " ON DUPLICATE KEY UPDATE " + ", ".join(
+    f"{column}=VALUES({column})" for column in THROW_COLUMNS + SCORE_COLUMNS
+)
+REPLAY_DELETE = "DELETE FROM data WHERE date=? AND game=?"
+
+
+class Game:
+    """
+        A stored game. Throws and accumulated scores are kept together in one array of shorts (MISSING where a
+        throw was not bowled or a score not written), a fraction of the size of the 33-column row it comes from.
+        Frame scores are calculated on first use and kept.
+    """
+    __slots__ = ("date", "game", "values", "_frame_scores")
+
+    MISSING = -1
+
+    def __init__(self, date: t_date | str, game: int, values: array):
+        self.date = date
+        self.game = game
+        self.values = values
+        self._frame_scores = None
+
+    @staticmethod
+    def from_row(row: tuple) -> "Game":
+        return Game(row[0], row[1], array("h", [Game.MISSING if value is None else value for value in row[2:]]))
+
+    def to_row(self) -> tuple:
+        return (self.date, self.game) + tuple(None if value < 0 else value for value in self.values)
+
+    @property
+    def key(self) -> tuple:
+        return self.date, self.game
+
+    @property
+    def throws(self) -> list[int | None]:
+        return [None if value < 0 else value for value in self.values[:21]]
+
+    @property
+    def scores(self) -> list[int | None]:
+        return [None if value < 0 else value for value in self.values[21:]]
+
+    @property
+    def total(self) -> int | None:
+        total = self.values[30]
+        return None if total < 0 else total
+
+    @property
+    def complete(self) -> bool:
+        return self.values[30] >= 0
+
+    def get_frame(self, frame: int) -> list[int | None]:
+        start = (frame - 1) * 2
+        return [None if value < 0 else value for value in self.values[start:start + (3 if frame == 10 else 2)]]
+
+    @property
+    def frame_scores(self) -> list[int] | None:
+        """
+            Points scored in each frame, None until the game is complete
+        """
+        if self._frame_scores is None and self.complete:
+            self._frame_scores = GameUtils.calc_frame_scores(self.throws)
+        return self._frame_scores
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, Game) and (self.date, self.game) == (other.date, other.game)
+                and self.values == other.values)
+
+    def __repr__(self) -> str:
+        return f"Game({self.date}, {self.game}, {self.to_row()[2:]})"
+
+
+class GameCache:
+    """
+        Bounded LRU of the games read by Interface, by (date, game) and by date. A write to a game drops it and the
+        game list of its date; a game known not to exist is cached too. Other clients' writes are not seen, so
+        entries expire after `ttl` seconds. Reads that raced a write (`generation` changed while querying) are not
+        stored.
+    """
+    ABSENT = object()
+
+    def __init__(self, max_games: int = GAME_CACHE_SIZE, max_dates: int = DATE_LIST_CACHE_SIZE,
+                 ttl: float = GAME_CACHE_TTL):
+        self.max_games = max_games
+        self.max_dates = max_dates
+        self.ttl = ttl
+        self.games: OrderedDict[tuple, tuple[Game | object, float]] = OrderedDict()  # (date, game) -> (game, expiry)
+        self.dates: OrderedDict[str, tuple[tuple[Game, ...], float]] = OrderedDict()  # date -> (games, expiry)
+        self.lock = Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, date: str, game: int = None) -> list[Game] | None:
+        """
+            Returns the cached games (as Interface.get_game would), or None if they are not cached
+        """
+        with self.lock:
+            entries, key = (self.games, (str(date), game)) if game else (self.dates, str(date))
+            cached = entries.get(key)
+            if cached is not None and cached[1] > monotonic():
+                entries.move_to_end(key)
+                self.hits += 1
+                if game:
+                    return [] if cached[0] is GameCache.ABSENT else [cached[0]]
+                return list(cached[0])
+
+            if cached is not None:  # Expired
+                del entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, date: str, game: int | None, games: list[Game], generation: int):
+        with self.lock:
+            if generation != self.generation:
+                return
+
+            if game:
+                self.__put_game((str(date), game), games[0] if games else GameCache.ABSENT)
+                return
+
+            self.dates[str(date)] = (tuple(games), monotonic() + self.ttl)
+            if len(self.dates) > self.max_dates:
+                self.dates.popitem(last=False)
+            for stored in games:
+                self.__put_game((str(date), stored.game), stored)
+
+    def invalidate(self, date: str, game: int = None):
+        """
+            Drops a game, or with no `game` every game on `date`, and the game list of `date`
+        """
+        with self.lock:
+            self.generation += 1
+            self.dates.pop(str(date), None)
+            if game:
+                self.games.pop((str(date), game), None)
+            else:
+                for key in [key for key in self.games if key[0] == str(date)]:
+                    del self.games[key]
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.games.clear()
+            self.dates.clear()
+
+    def __put_game(self, key: tuple, value: Game | object):
+        self.games[key] = (value, monotonic() + self.ttl)
+        self.games.move_to_end(key)
+        if len(self.games) > self.max_games:
+            self.games.popitem(last=False)
 
 
 class Interface:
     def __init__(self, username: str, password: str, database: str,
                  sheet_id: str, sheet_range: str,
-                 debug: bool = False, testing: bool = False):
+                 debug: bool = False, testing: bool = False, pool_size: int = 1, pool: MariaDBPool = None,
+                 backup: bool = False, sync: bool = False, backend: str = "mariadb"):
+        """
+            `backend` is "mariadb", or "sqlite" for an embedded database in the file named by `database`
+        """
         self.valid = True
         self.offline = False
         self.err: list = []
         self.debug = debug
+        self.game_counts: dict[str, tuple[int, int, float]] = {}  # date -> (games played, highest game, expiry)
+        self.cache = GameCache()
+        self.stats: QueryStats | None = None
+        self.credentials = (username, password, database, pool_size)
+        self.backend = backend
+        self.sync = sync
+        self.last_reconnect = 0.0
+        self.renumbered: list[tuple[str, int, int]] = []  # (date, offline number, saved number) of the last replay
 
-        self.interface = MariaDBInterface(username, password, database)
-        # self.backup = GoogleSheetInterface(sheet_id, sheet_range)
+        self.interface = self.__connect(pool)
+        self.pool = getattr(self.interface, "pool", None)
+        self.backup = None
+        self.backup_index = None
+        self.backup_lock = RLock()  # The Sheets client is not thread safe
+        self.sync_worker = None
+        if backup:
+            self.backup = GoogleSheetInterface(sheet_id, sheet_range, len(DATA_COLUMNS))
+            if self.backup.valid:
+                self.backup_index = self.backup.add_sheet(f"{sheet_range}_index", len(INDEX_COLUMNS))
 
         if not self.interface.valid:
             self.valid = False
             self.err.append(self.interface.err)
-        # if not self.backup.valid:
-        #     self.valid = False
-        #     self.err += self.interface.err
+        if self.backup and not self.backup.valid:
+            self.valid = False
+            self.err.append(self.backup.err)
+
+        if self.valid and self.backup and sync:
+            self.start_sync()
+
+    def close(self):
+        if self.sync_worker:
+            self.sync_worker.stop()
+        if self.offline:
+            self.interface.close()
+
+    def start_sync(self):
+        """
+            Starts the worker copying queued games to the backup, if it is not running
+        """
+        if not self.sync_worker:
+            self.sync_worker = SyncWorker(self)
+            self.sync_worker.start()
+
+    def enable_stats(self, slow_ms: float = None, slow_log_path: str = None) -> QueryStats:
+        """
+            Starts recording per-statement timings of the database and backup (see QueryStats), logging
+            operations slower than `slow_ms`. Returns the stats, which keep collecting across offline/online switches.
+        """
+        if not self.stats:
+            self.stats = QueryStats(slow_ms, slow_log_path)
+        self.stats.slow_ms = slow_ms
+        self.stats.slow_log_path = slow_log_path
+
+        for interface in (self.interface, self.backup, self.backup_index):
+            if interface:
+                interface.enable_stats(self.stats)
+        return self.stats
+
+    def disable_stats(self):
+        for interface in (self.interface, self.backup, self.backup_index):
+            if interface:
+                interface.disable_stats()
+        self.stats = None
+
+    def __connect(self, pool: MariaDBPool = None):
+        username, password, database, pool_size = self.credentials
+        if self.backend == "sqlite":
+            return get_backend("sqlite")(database, SQLITE_SCHEMA)
+
+        return get_backend(self.backend)(username, password, database, pool_size, pool)
+
+    def errors(self) -> tuple:
+        """
+            Exception types raised when the database cannot be reached, after which go_offline can take over
+        """
+        return get_backend(self.backend).errors()
+
+    def go_offline(self, path: str) -> bool:
+        """
+            Switches to the local snapshot at `path`. Reads come from the snapshot and writes are journaled
+            until go_online replays them.
+        """
+        interface = OfflineInterface(path, DATA_COLUMNS, (DATA_SCHEMA,))
+        if not interface.valid:
+            self.err.append(interface.err)
+            return False
+
+        if self.sync_worker:
+            self.sync_worker.stop()
+            self.sync_worker = None
+
+        self.interface = interface
+        if self.stats:
+            interface.enable_stats(self.stats)
+        self.offline = True
+        self.valid = True
+        self.game_counts.clear()
+        self.cache.clear()
+        self.last_reconnect = monotonic()
+        return True
+
+    def go_online(self, min_interval: float = 0.0) -> int | None:
+        """
+            Reconnects to the database and replays the offline journal, at most once every `min_interval` seconds.
+            The journal is replayed in one transaction. Games created offline were numbered from the snapshot, so one
+            whose number was taken on the server since is saved under the next free number instead of replacing the
+            server's game; these are listed in `renumbered`. Returns the number of games replayed, or None if still
+            offline.
+        """
+        if not self.offline or monotonic() - self.last_reconnect < min_interval:
+            return None
+        self.last_reconnect = monotonic()
+
+        interface = self.__connect()
+        if not interface.valid:
+            return None
+        if self.stats:
+            interface.enable_stats(self.stats)
+
+        journal = self.interface
+        last_seq, new_rows, changed_rows, deleted = journal.get_journal()
+        new_rows, self.renumbered = self.__renumber(interface, new_rows)
+        statements = ([(REPLAY_DELETE, key) for key in deleted]
+                      + [(REPLAY_UPDATE, row) for row in changed_rows]
+                      + [(REPLAY_INSERT, row) for row in new_rows])
+        if statements:
+            interface.run_statements(statements)
+        journal.clear_journal(last_seq)
+        journal.close()
+
+        self.interface = interface
+        self.pool = getattr(interface, "pool", None)
+        self.offline = False
+        self.game_counts.clear()
+        self.cache.clear()
+        if self.sync and self.backup and self.backup.valid:
+            self.start_sync()
+
+        rows = changed_rows + new_rows
+        for date in sorted({row[0] for row in rows} | {date for date, _ in deleted}):
+            self.refresh_summary(date)
+        self.queue_sync_rows([row[:2] for row in rows] + deleted)
+
+        return len(rows) + len(deleted)
+
+    @staticmethod
+    def __renumber(interface, rows: list[tuple]) -> tuple[list[tuple], list[tuple[str, int, int]]]:
+        """
+            Moves games created offline whose (date, game) exists on the server to the next free number of their
+            date, keeping their order. Returns the rows and the (date, offline number, new number) of moved games.
+        """
+        taken: dict[str, set[int]] = {}
+        renumbered = []
+        result = []
+        for row in sorted(rows, key=lambda row: (str(row[0]), row[1])):
+            date, game = str(row[0]), row[1]
+            if date not in taken:
+                taken[date] = {stored[0] for stored in interface.get_grouped("data", "game", (), ("date",), (date,))}
+
+            if game in taken[date]:
+                new_game = max(taken[date]) + 1
+                renumbered.append((date, game, new_game))
+                row = (row[0], new_game) + tuple(row[2:])
+                game = new_game
+            taken[date].add(game)
+            result.append(row)
+
+        return result, renumbered
+
+    def save_snapshot(self, path: str) -> int:
+        """
+            Brings the local snapshot used by offline mode up to date. Month fingerprints of the snapshot and the
+            database are compared and only the months that differ are copied. Returns the number of games copied.
+        """
+        if self.offline:
+            return 0
+
+        snapshot = OfflineInterface(path, DATA_COLUMNS, (DATA_SCHEMA,))
+        if not snapshot.valid:
+            return 0
+
+        local_months = self.get_fingerprints(by="month", interface=snapshot)
+        server_months = self.get_fingerprints(by="month")
+        count = 0
+        for month in sorted(month for month in local_months.keys() | server_months.keys()
+                            if local_months.get(month) != server_months.get(month)):
+            start, end = Summary.month_of(DateUtils.to_date(f"{month}-01", "%Y-%m-%d"))
+            count += snapshot.load_snapshot((game.to_row() for game in self.iter_games(
+                str(start), str(end - timedelta(days=1))
+            )), start, end)
+        snapshot.close()
+        return count
+
+    def export_archive(self, path: str, start: str = None, end: str = None) -> int:
+        """
+            Writes the games with `start` <= date <= `end` to a binary archive (see bowlingarchive).
+            Returns the number of games written.
+        """
+        from bowlingarchive import BowlingArchive
+
+        return BowlingArchive.export(path, (game.to_row() for game in self.iter_games(start, end, ARCHIVE_CHUNK_SIZE)),
+                                     ARCHIVE_CHUNK_SIZE)
+
+    def get_game_counts(self, date: str) -> tuple[int, int]:
+        """
+            Returns (games played, highest game number) on `date`. Counted by the database, then kept up to date by
+            this Interface's writes and counted again after GAME_COUNT_TTL seconds so other clients' games show up.
+        """
+        counts = self.game_counts.get(date)
+        if counts is None or counts[2] <= monotonic():
+            games_played, last_game = self.interface.get_aggregate("data", ("COUNT(*)", "COALESCE(MAX(game), 0)"),
+                                                                   ("date",), (date,))
+            counts = self.game_counts[date] = (int(games_played), int(last_game), monotonic() + GAME_COUNT_TTL)
+
+        return counts[:2]
 
     def get_games_played(self, date: str) -> int:
-        games_played = len(self.interface.get_row("data", ("date",), (date,)))
+        return self.get_game_counts(date)[0]
 
-        return games_played
+    def next_game(self, date: str) -> int:
+        return self.get_game_counts(date)[1] + 1
 
-    def get_game(self, date: str, game: int = None) -> list:
+    def forget_date(self, date: str):
+        """
+            Drops the game counts and cached games of `date`, for when another client may have written to it
+        """
+        self.game_counts.pop(date, None)
+        self.cache.invalidate(date)
+
+    def get_game(self, date: str, game: int = None) -> list[Game]:
+        """
+            Returns the game, or every game on `date`, served from the game cache when possible. A cached game list
+            is only served while it matches the date's game counts, which pick up games saved by other clients.
+        """
+        cached = self.cache.get(date, game)
+        if cached is not None and not game and (len(cached), max((stored.game for stored in cached), default=0)) \
+                != self.get_game_counts(date):
+            self.cache.invalidate(date)
+            cached = None
+        if cached is not None:
+            return cached
+
+        generation = self.cache.generation
         if not game:
-            return self.interface.get_row("data", ("date",), (date,))
+            rows = self.interface.get_row("data", ("date",), (date,))
         else:
-            return self.interface.get_row("data", ("date", "game"), (date, game))
+            rows = self.interface.get_row("data", ("date", "game"), (date, game))
+
+        games = [Game.from_row(row) for row in rows or ()]
+        self.cache.put(date, game, games, generation)
+        return games
+
+    def iter_games(self, start: str = None, end: str = None, chunk_size: int = 500):
+        """
+            Yields every game with `start` <= date <= `end` (either may be omitted) in (date, game) order,
+            reading `chunk_size` rows at a time
+        """
+        search_keys, search_values = (), ()
+        if start:
+            search_keys, search_values = search_keys + ("date>=",), search_values + (start,)
+        if end:
+            search_keys, search_values = search_keys + ("date<=",), search_values + (end,)
+
+        return map(Game.from_row, self.interface.iter_rows("data", ("date", "game"), search_keys, search_values,
+                                                           chunk_size))
 
     def new_game(self, date: str):
-        games_played = self.get_games_played(date)
+        game = self.next_game(date)
 
-        if not games_played:
-            self.interface.add_row("data", ("date", "game",), (date, 1,))
-        else:
-            self.interface.add_row("data", ("date", "game",), (date, games_played + 1,))
+        self.interface.add_row("data", ("date", "game",), (date, game,))
+        self.cache.invalidate(date, game)
+        self.__count_game(date, game)
 
     def delete_game(self, date: str, game: int) -> bool:
         if not self.get_game(date, game):
             return False
 
         self.interface.del_row("data", ("date", "game",), (date, game,))
+        self.cache.invalidate(date, game)
+        self.__count_game(date, game, deleted=True)
+        self.refresh_summary(date)
+        self.queue_sync(date, game)
         return True
 
     def add_frame(self, date: str, game: int, frame: int, frame_score: list[int]):
@@ -69,28 +534,529 @@ class Interface:
             self.interface.set_row("data", (f"f{frame}_2",), (frame_score[1],), ("date", "game",), (date, game,))
         if frame == 10 and len(frame_score) == 3:
             self.interface.set_row("data", (f"f{frame}_3",), (frame_score[2],), ("date", "game",), (date, game,))
+        self.cache.invalidate(date, game)
 
     def modify_frame(self, date: str, game: int, frame: int, throw: int, value: int):
         self.interface.set_row("data", (f"f{frame}_{throw}",), (value,), ("date", "game",), (date, game,))
+        self.cache.invalidate(date, game)
+        self.refresh_summary(date)
+        self.queue_sync(date, game)
+
+    def update_frame(self, date: str, game: int, frame: int, frame_data: list[int], stored: Game) -> dict[int, int]:
+        """
+            Writes the throws of a modified frame together with the accumulated scores that changed because of it
+            as one statement. `stored` is the game as currently stored. Incomplete games are not rescored.
+        """
+        throws, scores = stored.throws, stored.scores
+        start = GameSession.frame_index(frame)
+        throws[start:start + len(frame_data)] = frame_data
+
+        changed = {}
+        if None not in scores:
+            changed = GameUtils.rescore_frames(throws, scores, frame)
+
+        target_keys = tuple(f"f{frame}_{throw}" for throw in range(1, len(frame_data) + 1))
+        target_keys += tuple(f"f{n}_s" for n in changed)
+        target_values = tuple(frame_data) + tuple(changed.values())
+
+        self.interface.set_row("data", target_keys, target_values, ("date", "game",), (date, game,))
+        self.cache.invalidate(date, game)
+        if None not in scores:
+            self.refresh_summary(date)
+            self.queue_sync(date, game)
+
+        return changed
 
     def add_score(self, date: str, game: int, frame: int, value: int):
         self.interface.set_row("data", (f"f{frame}_s",), (value,), ("date", "game",), (date, game,))
+        self.cache.invalidate(date, game)
+        if frame == 10:
+            self.refresh_summary(date)
+            self.queue_sync(date, game)
 
-    def pull_data(self, date: str, game: int):
-        # TODO: Pull data from backup
+    def new_session(self, date: str, game: int = None, checkpoint: int = 0) -> "GameSession":
+        if not game:
+            game = self.next_game(date)
 
-        return
+        return GameSession(self, date, game, checkpoint)
 
-    def push_data(self, date: str, game: int):
-        # TODO: Push data to backup
+    def save_game(self, date: str, game: int, throws: list[int | None], scores: list[int] = None,
+                  exists: bool = False):
+        """
+            Writes a whole game (throws and, if given, frame scores) as a single statement and commit. Offline, a
+            game saved before the snapshot was last updated is restored into it.
+        """
+        target_keys = THROW_COLUMNS + (SCORE_COLUMNS if scores else ())
+        target_values = tuple(throws) + (tuple(scores) if scores else ())
 
-        return
+        if exists and self.offline and not self.interface.get_row("data", ("date", "game"), (date, game), num_rows=1):
+            self.interface.restore_row("data", ("date", "game",) + target_keys, (date, game,) + target_values)
+            self.__count_game(date, game)
+        elif exists:
+            self.interface.set_row("data", target_keys, target_values, ("date", "game",), (date, game,))
+        else:
+            self.interface.add_row("data", ("date", "game",) + target_keys, (date, game,) + target_values)
+            self.__count_game(date, game)
+        self.cache.invalidate(date, game)
+
+        if scores:
+            self.refresh_summary(date)
+            self.queue_sync(date, game)
+
+    def queue_sync(self, date: str, game: int):
+        """
+            Records that a game changed so the sync worker copies it to the backup. Does nothing without a worker.
+        """
+        self.queue_sync_rows([(date, game)])
+
+    def queue_sync_rows(self, keys: list[tuple]):
+        """
+            queue_sync for many (date, game) keys, one transaction per REPLAY_BATCH_SIZE keys
+        """
+        if not self.sync_worker or not keys:
+            return
+
+        for i in range(0, len(keys), REPLAY_BATCH_SIZE):
+            self.interface.run_statements([
+                ("INSERT INTO sync_queue (date, game) VALUES (?, ?) ON DUPLICATE KEY UPDATE version=version+1",
+                 tuple(key)) for key in keys[i:i + REPLAY_BATCH_SIZE]
+            ])
+        self.sync_worker.notify()
+
+    def import_csv(self, file_path: str, progress=None) -> tuple[int, list[int]]:
+        """
+            Loads games from a CSV file laid out like the `data` table, with a header row. Each game is validated
+            and its frame scores are recalculated, so the score columns may be left out. Games already stored are
+            overwritten. Returns (games imported, line numbers rejected).
+            With a sync worker, each chunk's games are queued for the backup once the chunk is stored.
+        """
+        chunk_keys = []
+
+        def parse(cells: list[str]) -> tuple | None:
+            row = GameUtils.parse_csv_game(cells)
+            if row and self.sync_worker:
+                chunk_keys.append(row[:2])
+            return row
+
+        def stored(lines: int):
+            self.queue_sync_rows(chunk_keys)
+            chunk_keys.clear()
+            if progress:
+                progress(lines)
+
+        imported, rejected = self.interface.import_csv("data", file_path, DATA_COLUMNS, THROW_COLUMNS + SCORE_COLUMNS,
+                                                       parse, IMPORT_CHUNK_SIZE, stored)
+
+        self.game_counts.clear()
+        self.cache.clear()
+        if imported:
+            self.rebuild_summary()
+
+        return imported, rejected
+
+    def __update_index(self, dates: set[str]):
+        """
+            Adds backup index rows for those of `dates` that have none. Index rows are formulas over the backup's
+            rows, so they stay correct whatever changes the backup, and only new dates need writing.
+        """
+        if not dates or not self.backup_index:
+            return
+
+        index_keys = self.backup_index.get_keys()
+        if (INDEX_TOTAL,) not in index_keys:  # New, or written by a version that stored the fingerprints
+            self.__rebuild_index(dates)
+            return
+
+        self.backup_index.del_row(self.backup_index.blank_rows)
+        self.backup_index.add_row([self.__index_row(date) for date in sorted(dates) if (date,) not in index_keys],
+                                  formulas=True)
+
+    def __rebuild_index(self, dates: set[str] = frozenset()):
+        """
+            Rewrites the backup index with a row for every date in the database, the backup and `dates`
+        """
+        dates = set(dates) | set(self.get_fingerprints()) | {key[0] for key in self.backup.get_keys()}
+
+        self.backup_index.purge_table()
+        self.backup_index.set_header(INDEX_COLUMNS)
+        self.backup_index.get_keys()
+        self.backup_index.del_row(self.backup_index.blank_rows)
+        self.backup_index.add_row([self.__index_row(date) for date in [INDEX_TOTAL] + sorted(dates)], formulas=True)
+
+    def __index_row(self, date: str) -> list:
+        """
+            Backup index row of `date`, or of every game for INDEX_TOTAL: formulas computing FINGERPRINT over the
+            backup's rows
+        """
+        def cells(column: str) -> str:
+            letter = GoogleSheetInterface.get_abc_col(DATA_COLUMNS.index(column) + 1)
+            return f"'{self.backup.sheet_range}'!{letter}{self.backup.header_rows + 1}:{letter}"
+
+        matches = f'({cells("date")}<>"")' if date == INDEX_TOTAL else f'({cells("date")}="{date}")'
+        weighted = " + ".join(f'{weight} * ({cells(column)}<>"") * ({cells(column)} + 1)'
+                              for weight, column in enumerate(CHECKSUM_COLUMNS, start=1))
+
+        return [f"'{date}", f"=SUMPRODUCT({matches} * 1)", f"=SUMPRODUCT({matches} * {cells('game')} * ({weighted}))"]
+
+    @staticmethod
+    def __to_fingerprint(row: list) -> tuple[int, int] | None:
+        """
+            Fingerprint read from a backup index row, None if its formulas failed (ex. text typed in a score cell)
+        """
+        try:
+            return int(row[1]), int(row[2])
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def __in_scope(date: str = None, game: int = None):
+        if game:
+            return lambda key: key == (date, game)
+        elif date:
+            return lambda key: key[0] == date
+
+        return lambda key: True
+
+    @staticmethod
+    def __to_backup(game: Game) -> list:
+        return [str(game.date), game.game] + game.throws + game.scores
+
+    @staticmethod
+    def __from_backup(row: list) -> tuple:
+        return (str(row[0]),) + tuple(None if value is None else int(value) for value in row[1:])
+
+    def __count_game(self, date: str, game: int, deleted: bool = False):
+        counts = self.game_counts.get(date)
+        if counts is None:
+            return
+
+        games_played, last_game, expiry = counts
+        if not deleted:
+            self.game_counts[date] = (games_played + 1, max(last_game, game), expiry)
+        elif game != last_game:
+            self.game_counts[date] = (games_played - 1, last_game, expiry)
+        else:
+            del self.game_counts[date]
+
+    def refresh_summary(self, date: str):
+        if self.offline:  # Rebuilt for the journaled dates by go_online
+            return
+
+        self.interface.run_statements(Summary.refresh(DateUtils.to_date(date, "%Y-%m-%d")))
+
+    def rebuild_summary(self):
+        if self.offline:
+            return
+
+        self.interface.run_statements(Summary.rebuild())
+
+    def get_stats(self, window: str = "overall", date: str = None) -> dict | None:
+        bounds = Statistics.window(window, DateUtils.to_date(date) if date else None)
+        if bounds is None:
+            return None
+
+        return Statistics.get_stats(self.interface, *bounds, summary=not self.offline)
+
+    def pull_data(self, date: str = None, game: int = None) -> int:
+        """
+            Copies games from the backup into the database: one game, every game on a date, or (with neither given)
+            every game. Games are read with one or two batch requests and written in one transaction.
+        """
+        with self.backup_lock:
+            if date:
+                in_scope = self.__in_scope(date, game)
+                row_numbers = sorted(row_number for key, row_number in self.backup.get_keys().items()
+                                     if in_scope(key))
+                rows = self.backup.get_row(row_numbers) if row_numbers else []
+            else:
+                rows = self.backup.get_row()
+
+            rows = [self.__from_backup(row) for row in rows if row[0] is not None]
+            self.interface.upsert_rows("data", DATA_COLUMNS, rows, THROW_COLUMNS + SCORE_COLUMNS)
+
+            dates = {row[0] for row in rows}
+            for pulled_date in dates:
+                self.game_counts.pop(pulled_date, None)
+                self.cache.invalidate(pulled_date)
+            if not date:
+                self.rebuild_summary()
+            elif dates:
+                self.refresh_summary(date)
+
+            return len(rows)
+
+    def push_data(self, date: str = None, game: int = None) -> int:
+        """
+            Copies games from the database to the backup: one game, every game on a date, or (with neither given)
+            every game. Games missing from the database are cleared from the backup. Uses one read of the backup's
+            keys and one batch request per BATCH_SIZE updated, appended or cleared rows.
+        """
+        if game:
+            games = self.get_game(date, game)
+        else:
+            games = list(self.iter_games(date, date))
+
+        return self.push_rows(games, self.__in_scope(date, game))
+
+    def push_rows(self, games: list[Game], in_scope=None) -> int:
+        """
+            Writes `games` to the backup, and deletes backup rows matching `in_scope((date, game))` that are not in
+            `games`
+        """
+        with self.backup_lock:
+            keys = self.backup.get_keys()
+            if not keys:
+                self.backup.set_header(DATA_COLUMNS)
+
+            local = {(str(game.date), game.game): self.__to_backup(game) for game in games}
+            updates, appends = {}, []
+            for key, cells in local.items():
+                if key in keys:
+                    updates[keys[key]] = cells
+                else:
+                    appends.append(cells)
+            removed = [key for key in keys if in_scope and in_scope(key) and key not in local]
+
+            # Updated before the deletions move rows up, appended after them so nothing lands in a deleted row
+            self.backup.set_row(updates)
+            self.backup.del_row([keys[key] for key in removed] + self.backup.blank_rows)
+            self.backup.add_row(appends)
+
+            self.__update_index({key[0] for key in local} | {key[0] for key in removed})
+
+            return len(local) + len(removed)
+
+    def get_fingerprints(self, start: t_date = None, end: t_date = None, by: str = "date",
+                         interface=None) -> dict[str, tuple]:
+        """
+            Returns {date or "YYYY-MM": (games, checksum)} for games with `start` <= date < `end`, read from
+            `interface` if given instead of the database
+        """
+        search_keys, search_values = Statistics.search(start, end)
+        group_by = "date" if by == "date" else "DATE_FORMAT(date, '%Y-%m')"
+
+        return {str(group): (int(games), int(digest))
+                for group, games, digest in (interface or self.interface).get_grouped("data", group_by, FINGERPRINT,
+                                                                                      search_keys, search_values)}
 
     def check_diff(self) -> list[tuple[t_date, int]]:
-        # TODO: Checks if there are any differences between local database and backup
-        # For efficiency, first check dates and number of games,
+        """
+            Returns the (date, game) pairs that differ between the database and the backup.
+            The backup's fingerprints are computed by the index sheet's formulas from the backup's rows, so edits
+            made in the sheet are seen. Month fingerprints are compared first, then the dates of differing months,
+            and only the games of differing dates are read from the backup. If the backup holds games of dates the
+            index has no row for, every game is compared and the missing index rows are added.
+        """
+        with self.backup_lock:
+            if (INDEX_TOTAL,) not in self.backup_index.get_keys():
+                self.__rebuild_index()
+
+            remote_dates = {str(row[0]): self.__to_fingerprint(row)
+                            for row in self.backup_index.get_row() if row[0] is not None}
+            remote_total = remote_dates.pop(INDEX_TOTAL, None)
+            remote_dates = {date: fingerprint for date, fingerprint in remote_dates.items() if fingerprint != (0, 0)}
+
+            remote_months, indexed = {}, (0, 0)
+            for date, fingerprint in remote_dates.items():
+                remote_months[date[:7]] = self.__add_fingerprints(remote_months.get(date[:7], (0, 0)), fingerprint)
+                indexed = self.__add_fingerprints(indexed, fingerprint)
 
-        pass
+            if remote_total is None or indexed != remote_total:  # Unindexed or unreadable rows in the backup
+                return self.__diff_rows(None)
+
+            local_months = self.get_fingerprints(by="month")
+            months = {month for month in local_months.keys() | remote_months.keys()
+                      if local_months.get(month) != remote_months.get(month)}
+
+            dates = set()
+            for month in sorted(months):
+                local_dates = self.get_fingerprints(*Summary.month_of(DateUtils.to_date(f"{month}-01", "%Y-%m-%d")))
+                month_dates = {date: fingerprint for date, fingerprint in remote_dates.items() if date[:7] == month}
+                dates |= {date for date in local_dates.keys() | month_dates.keys()
+                          if local_dates.get(date) != month_dates.get(date)}
+
+            return self.__diff_rows(dates) if dates else []
+
+    @staticmethod
+    def __add_fingerprints(first: tuple | None, second: tuple | None) -> tuple | None:
+        if first is None or second is None:
+            return None
+        return first[0] + second[0], first[1] + second[1]
+
+    def __diff_rows(self, dates: set[str] | None) -> list[tuple[t_date, int]]:
+        """
+            Compares the games of `dates` (every game if None) row by row
+        """
+        remote_rows = {}
+        if dates is None:
+            rows = self.backup.get_row()
+        else:
+            rows = self.backup.get_row(sorted(row_number for key, row_number in self.backup.get_keys().items()
+                                              if key[0] in dates))
+        for row in rows:
+            if row[0] is not None:
+                try:
+                    row = self.__from_backup(row)
+                except (TypeError, ValueError):  # Not a game, ex. text typed in a score cell
+                    row = (str(row[0]), row[1]) + tuple(row[2:])
+                remote_rows[row[:2]] = row
+
+        local_rows = {}
+        for games in ([self.iter_games()] if dates is None else (self.iter_games(date, date) for date in dates)):
+            for game in games:
+                row = self.__from_backup(self.__to_backup(game))
+                local_rows[row[:2]] = row
+
+        if dates is None:
+            self.__update_index({key[0] for key in remote_rows})
+
+        return [(DateUtils.to_date(date, "%Y-%m-%d"), game)
+                for date, game in sorted(local_rows.keys() | remote_rows.keys())
+                if local_rows.get((date, game)) != remote_rows.get((date, game))]
+
+
+class SyncWorker(Thread):
+    """
+        Copies games listed in `sync_queue` to the backup in the background, so score entry never waits on Sheets.
+        Queued games are pushed in batches, failed pushes are retried with exponential backoff, and entries changed
+        again while a push was running stay queued for the next pass.
+    """
+    def __init__(self, instance: Interface, interval: float = 5.0, max_backoff: float = 300.0,
+                 batch_size: int = 500):
+        super().__init__(name="SyncWorker", daemon=True)
+        self.instance = instance
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.failures = 0
+        self.last_error = None
+        self.synced = 0
+        self.wakeup = Event()
+        self.stopping = Event()
+
+    def run(self):
+        delay = self.interval
+        while not self.stopping.is_set():
+            self.wakeup.wait(delay)
+            self.wakeup.clear()
+            if self.stopping.is_set():
+                break
+
+            try:
+                while self.sync() == self.batch_size:
+                    pass
+                self.failures = 0
+                delay = self.interval
+            except Exception as err:
+                self.failures += 1
+                self.last_error = err
+                delay = min(self.interval * 2 ** self.failures, self.max_backoff)
+
+    def sync(self) -> int:
+        """
+            Pushes one batch of queued games and removes their entries. Returns the number of entries handled.
+        """
+        entries = self.instance.interface.get_row("sync_queue", sort_keys=("queued",), sort_order=(False,),
+                                                  num_rows=self.batch_size)
+        if not entries:
+            return 0
+
+        keys = {(str(date), game) for date, game, _, _ in entries}
+        games = []
+        for date, game in keys:
+            games += self.instance.get_game(date, game)
+
+        self.instance.push_rows(games, lambda key: key in keys)
+        self.instance.interface.run_statements([
+            ("DELETE FROM sync_queue WHERE date=? AND game=? AND version=?", (date, game, version))
+            for date, game, _, version in entries
+        ])
+
+        self.synced += len(entries)
+        return len(entries)
+
+    def get_lag(self) -> tuple[int, int]:
+        """
+            Returns (queued games, age in seconds of the oldest queued change)
+        """
+        queued, lag = self.instance.interface.get_aggregate(
+            "sync_queue", ("COUNT(*)", "COALESCE(TIMESTAMPDIFF(SECOND, MIN(queued), NOW()), 0)")
+        )
+        return int(queued), int(lag)
+
+    def notify(self):
+        self.wakeup.set()
+
+    def stop(self, timeout: float = 10.0):
+        self.stopping.set()
+        self.wakeup.set()
+        self.join(timeout)
+
+
+class GameSession:
+    """
+        Write-behind buffer for a game being entered. Frames are kept in memory and the finished game is
+        persisted with one write. If `checkpoint` is set, the partial game is also written every `checkpoint` frames.
+    """
+    def __init__(self, interface: Interface, date: str, game: int, checkpoint: int = 0):
+        self.interface = interface
+        self.date = date
+        self.game = game
+        self.checkpoint = checkpoint
+        self.throws: list[int | None] = [None] * len(THROW_COLUMNS)
+        self.stored = False
+        self.last_checkpoint = 0
+
+    @staticmethod
+    def frame_index(frame: int) -> int:
+        return (frame - 1) * 2
+
+    def get_frame(self, frame: int) -> list[int | None]:
+        start = self.frame_index(frame)
+
+        return self.throws[start:start + (3 if frame == 10 else 2)]
+
+    def add_frame(self, frame: int, frame_score: list[int]):
+        start = self.frame_index(frame)
+        for i, value in enumerate(frame_score):
+            self.throws[start + i] = value
+
+        if self.checkpoint and frame - self.last_checkpoint >= self.checkpoint:
+            self.flush()
+            self.last_checkpoint = frame
+
+    def modify_frame(self, frame: int, throw: int, value: int):
+        self.throws[self.frame_index(frame) + throw - 1] = value
+
+    def flush(self, scores: list[int] = None):
+        """
+            Saves the game. If its number was taken by another client since the session started, the game is saved
+            under the next free number instead, up to SAVE_ATTEMPTS numbers.
+        """
+        for attempt in range(SAVE_ATTEMPTS):
+            try:
+                self.interface.save_game(self.date, self.game, self.throws, scores, self.stored)
+                break
+            except Exception:
+                if self.stored or attempt == SAVE_ATTEMPTS - 1 or not self.__taken():
+                    raise
+                self.game = self.interface.next_game(self.date)
+        self.stored = True
+
+    def __taken(self) -> bool:
+        self.interface.forget_date(self.date)
+        return bool(self.interface.get_game(self.date, self.game))
+
+    def finish(self) -> list[int]:
+        scores = GameUtils.accumulate_scores(GameUtils.calc_frame_scores(self.throws))
+        self.flush(scores)
+
+        return scores
+
+    def discard(self):
+        if self.stored:
+            self.interface.delete_game(self.date, self.game)
+            self.stored = False
 
 
 class GameUtils:
@@ -151,34 +1117,84 @@ class GameUtils:
         return True
 
     @staticmethod
-    def calc_frame_scores(data: list[int]) -> list[int]:
-        def parse_score(a, b, c, d, e):
-            if a == 10 and c == 10 and e == 10:  # Turkey
-                return a + c + e
-            elif a == 10 and c == 10:  # Double
-                return a + c + e
-            elif a == 10:  # Strike
-                return a + c + d
-            elif a + b == 10:  # Spare
-                return a + b + c
-            else:  # Everything Else
-                return a + b
+    def parse_score(a: int, b: int, c: int, d: int, e: int) -> int:
+        if a == 10 and c == 10 and e == 10:  # Turkey
+            return a + c + e
+        elif a == 10 and c == 10:  # Double
+            return a + c + e
+        elif a == 10:  # Strike
+            return a + c + d
+        elif a + b == 10:  # Spare
+            return a + b + c
+        else:  # Everything Else
+            return a + b
+
+    @staticmethod
+    def calc_frame_score(data: list[int], frame: int) -> int:
+        if frame == 10:
+            if data[20]:
+                return data[18] + data[19] + data[20]
+            return data[18] + data[19]
+        elif frame == 9:
+            return GameUtils.parse_score(data[16], data[17], data[18], data[19], data[19])
 
+        i = (frame - 1) * 2
+        return GameUtils.parse_score(data[i], data[i + 1], data[i + 2], data[i + 3], data[i + 4])
+
+    @staticmethod
+    def calc_frame_scores(data: list[int]) -> list[int]:
         cumulated_score = [0] * 10
 
         for i, tf1, tf2, nf1, nf2, nnf1 in zip(range(0, 8),
                                                data[0:19:2], data[1:19:2], data[2:19:2], data[3:19:2], data[4:19:2]):
-            cumulated_score[i] = parse_score(tf1, tf2, nf1, nf2, nnf1)
+            cumulated_score[i] = GameUtils.parse_score(tf1, tf2, nf1, nf2, nnf1)
 
-        cumulated_score[8] = parse_score(data[16], data[17], data[18], data[19], data[19])
-
-        if data[20]:
-            cumulated_score[9] = data[18] + data[19] + data[20]
-        else:
-            cumulated_score[9] = data[18] + data[19]
+        cumulated_score[8] = GameUtils.calc_frame_score(data, 9)
+        cumulated_score[9] = GameUtils.calc_frame_score(data, 10)
 
         return cumulated_score
 
+    @staticmethod
+    def rescore_frames(data: list[int], accumulated_scores: list[int], frame: int) -> dict[int, int]:
+        """
+            Recomputes the accumulated scores affected by a change to `frame`, which are the scores from two frames
+            before it (strike bonuses reach back two frames) through the tenth.
+            Returns only the scores that differ from `accumulated_scores`, keyed by frame number.
+        """
+        first = max(frame - 2, 1)
+        if first > 1 and accumulated_scores[first - 2] is None:
+            first = 1
+        running_sum = accumulated_scores[first - 2] if first > 1 else 0
+
+        changed = {}
+        for n in range(first, 11):
+            running_sum += GameUtils.calc_frame_score(data, n)
+            if running_sum != accumulated_scores[n - 1]:
+                changed[n] = running_sum
+
+        return changed
+
+    @staticmethod
+    def parse_csv_game(cells: list[str]) -> tuple | None:
+        """
+            Converts a CSV line (date, game, 21 throws, optionally followed by scores) into a `data` row with its
+            accumulated scores recalculated. Empty cells are missing throws. Returns None for an invalid game.
+        """
+        if len(cells) < 23:
+            return None
+
+        date = DateUtils.to_date(cells[0].strip())
+        game = GameUtils.to_int(cells[1])
+        throws = [None if cell.strip() == "" else GameUtils.to_int(cell) for cell in cells[2:23]]
+        if not date or not game or game < 1 or any(throw is None and cell.strip() != ""
+                                                   for throw, cell in zip(throws, cells[2:23])):
+            return None
+        if not GameUtils.verify_game(throws):
+            return None
+
+        scores = GameUtils.accumulate_scores(GameUtils.calc_frame_scores([throw or 0 for throw in throws]))
+        return (date, game) + tuple(throws) + tuple(scores)
+
     @staticmethod
     def accumulate_scores(cumulated_scores: list[int]) -> list[int]:
         accumulated_scores = [0] * 10
@@ -191,39 +1207,147 @@ class GameUtils:
         return accumulated_scores
 
     @staticmethod
-    def verify_game(game_data: list[int | None]) -> bool:
-        # TODO: verify that input list is a valid game
+    def calc_frame_scores_batch(data):
+        """
+            Vectorized calc_frame_scores for an (N, 21) matrix of throws (ex. rows of the `data` table sliced [2:23]).
+            Missing throws (None) count as 0. Returns an (N, 10) numpy array of frame scores.
+        """
+        import numpy as np
 
-        ident, frame_scores, scores = game_data[:3], game_data[3:24], game_data[24:]
-        print(ident)
-        print(frame_scores)
-        print(scores)
+        throws = np.nan_to_num(np.array(data, dtype=float).reshape(-1, 21)).astype(np.int32)
 
-        return True
+        # Frames 1-9, named as in calc_frame_scores: this frame (a, b), next frame (c, d), frame after next (e)
+        a, b = throws[:, 0:17:2], throws[:, 1:18:2]
+        c, d = throws[:, 2:19:2], throws[:, 3:20:2]
+        e = np.concatenate((throws[:, 4:19:2], throws[:, 19:20]), axis=1)
+
+        strike = a == 10
+        frame_scores = np.where(strike & (c == 10), a + c + e,  # Double/Turkey
+                                np.where(strike, a + c + d,  # Strike
+                                         np.where(a + b == 10, a + b + c,  # Spare
+                                                  a + b)))  # Everything Else
+        tenth = throws[:, 18] + throws[:, 19] + throws[:, 20]
+
+        return np.column_stack((frame_scores, tenth))
+
+    @staticmethod
+    def accumulate_scores_batch(cumulated_scores):
+        import numpy as np
+
+        return np.cumsum(cumulated_scores, axis=1)
+
+    @staticmethod
+    def verify_game(throws: list[int | None]) -> bool:
+        """
+            Checks that the 21 throws of a game (ordered as THROW_COLUMNS) form a complete, valid game
+        """
+        if len(throws) != 21:
+            return False
+
+        for i in range(0, 18, 2):
+            first, second = throws[i], throws[i + 1]
+            if first is None or not 0 <= first <= 10:
+                return False
+            if first == 10 and second is not None:
+                return False
+            if first < 10 and (second is None or not 0 <= second <= 10 - first):
+                return False
+
+        first, second, third = throws[18:]
+        if first is None or second is None or not 0 <= first <= 10:
+            return False
+        if not 0 <= second <= (10 if first == 10 else 10 - first):
+            return False
+        if first + second < 10:  # Open tenth, no third throw
+            return not third
+        if third is None:
+            return False
+
+        return 0 <= third <= (10 - second if first == 10 and second < 10 else 10)
 
 
 class DateUtils:
+    """
+        Dates typed by the user or read from files are parsed once: ISO (2023-01-25) and m/d/y (1/25/23) dates are
+        read directly, anything else goes through dateutil, and the last DATE_CACHE_SIZE results are kept.
+    """
     @staticmethod
     def is_date(value: str, dateformat: str = None) -> bool:
-        try:
-            if dateformat:
-                t_datetime.strptime(value, dateformat)
-            else:
-                parse_date(value, parserinfo(False, False))
-            return True
-        except ValueError or TypeError:
-            return False
+        return DateUtils.to_date(value, dateformat) is not None
 
     @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE)
     def to_date(value: str, dateformat: str = None) -> t_date | None:
         try:
-            if dateformat:
+            if dateformat == "%Y-%m-%d":
+                return t_date.fromisoformat(value)
+            elif dateformat:
                 return t_datetime.strptime(value, dateformat).date()
-            else:
-                return parse_date(value, parserinfo(False, False)).date()
-        except ValueError or TypeError as err:
+
+            fast = DateUtils.__fast_date(value)
+            if fast is not None:
+                return fast
+            from dateutil.parser import parse as parse_date
+
+            return parse_date(value, DateUtils.parser_info()).date()
+        except (ValueError, TypeError, OverflowError):
             return None
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def parser_info():
+        """
+            The dateutil parserinfo shared by every parse, built on first use so dateutil is only imported when needed
+        """
+        from dateutil.parser import parserinfo
+
+        return parserinfo(False, False)
+
+    @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE)
+    def normalize(value: str, dateformat: str = "%Y-%m-%d") -> str | None:
+        """
+            Parses `value` and returns it formatted as `dateformat`, or None if it is not a date
+        """
+        return DateUtils.format_date(DateUtils.to_date(value), dateformat)
+
+    @staticmethod
+    def __fast_date(value: str) -> t_date | None:
+        """
+            Reads ISO and m/d/y dates the same way dateutil would. Returns None for any other layout.
+        """
+        try:
+            if len(value) == 10 and value[4] == "-" and value[7] == "-":
+                return t_date.fromisoformat(value)
+
+            parts = value.split("/")
+            if len(parts) != 3 or not all(part.isdigit() for part in parts):
+                return None
+
+            month, day, year = parts
+            if len(year) == 2:
+                return t_date(DateUtils.__full_year(int(year)), int(month), int(day))
+            elif len(year) == 4:
+                return t_date(int(year), int(month), int(day))
+        except ValueError:  # Left to dateutil, which also accepts day/month/year
+            pass
+
+        return None
+
+    @staticmethod
+    def __full_year(year: int) -> int:
+        """
+            Two-digit years are taken within 50 years of the current year, as dateutil's parserinfo.convertyear does
+        """
+        current = t_date.today().year
+        year += current // 100 * 100
+        if year >= current + 50:
+            year -= 100
+        elif year < current - 50:
+            year += 100
+
+        return year
+
     @staticmethod
     def today(dateformat: str = "%Y-%m-%d") -> str:
         return t_date.today().strftime(dateformat)
@@ -232,6 +1356,8 @@ class DateUtils:
     def format_date(date: t_date, dateformat: str = "%Y-%m-%d") -> str | None:
         if not date:
             return None
+        if dateformat == "%Y-%m-%d":
+            return date.isoformat()
 
         return date.strftime(dateformat)
 
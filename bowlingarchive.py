@@ -0,0 +1,208 @@
+"""
+
+bowlingarchive.py
+Written by: William Lin
+
+Description:
+Compact binary archive of games for Bowling Score Tracker
+
+Every game is a fixed-width 37 byte record: the date as a day number, the game number, the 21 throws packed two to a
+byte and the 10 accumulated scores as uint16. Records are sorted by (date, game) and followed by a date index, so an
+archive is read through mmap as NumPy views without parsing or copying.
+    layout: header | records | date index
+
+"""
+
+import mmap
+import struct
+from datetime import date as t_date
+
+import numpy as np
+
+MAGIC = b"BWLA"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIQ8x")  # magic, version, record size, records, index entries, index offset
+MISSING_THROW = 0xF  # Nibble stored for a throw that was not bowled
+MISSING_SCORE = 0xFFFF
+
+RECORD = np.dtype([
+    ("day", "<u4"),  # date.toordinal()
+    ("game", "<u2"),
+    ("throws", "u1", (11,)),  # THROW_COLUMNS order, high nibble first, last nibble unused
+    ("scores", "<u2", (10,)),
+])
+INDEX = np.dtype([
+    ("day", "<u4"),
+    ("first", "<u4"),  # Number of the first record on `day`
+])
+
+
+class BowlingArchive:
+    """
+        Read-only view of an archive file. `records` is a structured array backed by the file, so opening an archive
+        costs the same whatever its size and pages are only read when touched.
+    """
+    def __init__(self, path: str):
+        self.valid = True
+        self.err = None
+        self.path = path
+        self.records = np.empty(0, RECORD)
+        self.index = np.empty(0, INDEX)
+
+        try:
+            with open(path, "rb") as file:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as err:
+            self.valid = False
+            self.err = err
+            self.map = None
+            return
+
+        if len(self.map) < HEADER.size:
+            self.valid = False
+            self.err = f"'{path}' is not a game archive"
+            return
+
+        magic, version, record_size, count, index_count, index_offset = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+            self.valid = False
+            self.err = f"'{path}' is not a version {VERSION} game archive"
+            return
+
+        self.records = np.frombuffer(self.map, RECORD, count, HEADER.size)
+        self.index = np.frombuffer(self.map, INDEX, index_count, index_offset)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def close(self):
+        """
+            Releases the file. While arrays returned by this archive are still referenced the mapping stays open
+            and is released when they are.
+        """
+        self.records = np.empty(0, RECORD)
+        self.index = np.empty(0, INDEX)
+        if self.map:
+            try:
+                self.map.close()
+            except BufferError:
+                pass
+            self.map = None
+
+    # Reading
+    def select(self, start: t_date = None, end: t_date = None):
+        """
+            Returns the records with `start` <= date <= `end` (either may be omitted) as a view, found with the index
+        """
+        days = self.index["day"]
+        first, last = 0, len(self.records)
+        if start:
+            i = np.searchsorted(days, start.toordinal())
+            first = self.index["first"][i] if i < len(days) else last
+        if end:
+            i = np.searchsorted(days, end.toordinal(), side="right")
+            last = self.index["first"][i] if i < len(days) else last
+
+        return self.records[first:last]
+
+    def get_days(self, start: t_date = None, end: t_date = None) -> list[t_date]:
+        days = self.index["day"]
+        if start:
+            days = days[days >= start.toordinal()]
+        if end:
+            days = days[days <= end.toordinal()]
+
+        return [t_date.fromordinal(int(day)) for day in days]
+
+    @staticmethod
+    def unpack_throws(records):
+        """
+            Returns the throws of `records` as an (N, 21) uint8 array, MISSING_THROW where a throw was not bowled
+        """
+        packed = records["throws"]
+
+        throws = np.empty((len(packed), 22), np.uint8)
+        throws[:, 0::2] = packed >> 4
+        throws[:, 1::2] = packed & 0xF
+        return throws[:, :21]
+
+    @staticmethod
+    def to_rows(records) -> list[tuple]:
+        """
+            Converts records back into `data` table rows, for code that expects Interface.get_game results
+        """
+        throws = BowlingArchive.unpack_throws(records).tolist()
+        scores = records["scores"].tolist()
+
+        return [
+            (t_date.fromordinal(day), game)
+            + tuple(None if throw == MISSING_THROW else throw for throw in game_throws)
+            + tuple(None if score == MISSING_SCORE else score for score in game_scores)
+            for day, game, game_throws, game_scores in zip(records["day"].tolist(), records["game"].tolist(),
+                                                          throws, scores)
+        ]
+
+    # Writing
+    @staticmethod
+    def pack(rows: list[tuple]):
+        """
+            Converts `data` table rows into an array of records
+        """
+        records = np.zeros(len(rows), RECORD)
+        if not rows:
+            return records
+
+        # None becomes NaN, then the missing marker of its field
+        values = np.array([row[1:] for row in rows], dtype=float)
+        throws = np.nan_to_num(values[:, 1:22], nan=MISSING_THROW).astype(np.uint8)
+        throws = np.concatenate((throws, np.full((len(rows), 1), MISSING_THROW, np.uint8)), axis=1)
+
+        records["day"] = [row[0].toordinal() for row in rows]
+        records["game"] = values[:, 0]
+        records["throws"] = throws[:, 0::2] << 4 | throws[:, 1::2]
+        records["scores"] = np.nan_to_num(values[:, 22:32], nan=MISSING_SCORE)
+        return records
+
+    @staticmethod
+    def export(path: str, rows, chunk_size: int = 10000) -> int:
+        """
+            Writes `rows` (`data` table rows sorted by date and game, ex. from Interface.iter_games) to a new archive,
+            `chunk_size` rows at a time. Returns the number of games written.
+        """
+        count = 0
+        days, firsts = [], []
+
+        with open(path, "wb") as file:
+            file.write(bytes(HEADER.size))
+
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) < chunk_size:
+                    continue
+                count = BowlingArchive.__write_chunk(file, chunk, count, days, firsts)
+                chunk = []
+            count = BowlingArchive.__write_chunk(file, chunk, count, days, firsts)
+
+            index = np.zeros(len(days), INDEX)
+            index["day"] = days
+            index["first"] = firsts
+
+            index_offset = file.tell()
+            file.write(index.tobytes())
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, count, len(index), index_offset))
+
+        return count
+
+    @staticmethod
+    def __write_chunk(file, rows: list[tuple], count: int, days: list[int], firsts: list[int]) -> int:
+        records = BowlingArchive.pack(rows)
+
+        for i, day in enumerate(records["day"].tolist()):
+            if not days or days[-1] != day:
+                days.append(day)
+                firsts.append(count + i)
+
+        file.write(records.tobytes())
+        return count + len(records)
@@ -0,0 +1,185 @@
+"""
+
+bowlingstats.py
+Written by: William Lin
+
+Description:
+Statistics for Bowling Score Tracker. Aggregates are computed by the database from the `data` table, so games are
+never loaded into Python to be counted.
+
+"""
+
+from datetime import date as t_date
+from datetime import timedelta
+
+
+def count_of(*conditions: str) -> str:
+    """
+        SQL expression counting how many of `conditions` hold for a row. NULL throws count as not holding.
+    """
+    return " + ".join(f"(CASE WHEN {condition} THEN 1 ELSE 0 END)" for condition in conditions)
+
+
+FRAMES = range(1, 10)
+TENTH_THIRD_FRESH = "(f10_1=10 AND f10_2=10 OR f10_1<10 AND f10_1+f10_2=10)"
+
+# Per-game expressions over a `data` row
+GAME_STRIKES = count_of(
+    *(f"f{n}_1=10" for n in FRAMES),
+    "f10_1=10",
+    "f10_1=10 AND f10_2=10",
+    f"{TENTH_THIRD_FRESH} AND f10_3=10"
+)
+GAME_STRIKE_CHANCES = "10 + " + count_of("f10_1=10", TENTH_THIRD_FRESH)
+GAME_SPARES = count_of(
+    *(f"f{n}_1<10 AND f{n}_1+f{n}_2=10" for n in FRAMES),
+    "f10_1<10 AND f10_1+f10_2=10",
+    "f10_1=10 AND f10_2<10 AND f10_2+f10_3=10"
+)
+GAME_SPARE_CHANCES = count_of(
+    *(f"f{n}_1<10" for n in FRAMES),
+    "f10_1<10",
+    "f10_1=10 AND f10_2<10"
+)
+GAME_OPENS = count_of(
+    *(f"f{n}_1+f{n}_2<10" for n in FRAMES),
+    "f10_1+f10_2<10"
+)
+
+STATISTICS = ("games", "pins", "high", "strikes", "strike_chances", "spares", "spare_chances", "opens")
+AGGREGATES = (
+    "COUNT(*)",
+    "SUM(f10_s)",
+    "MAX(f10_s)",
+    f"SUM({GAME_STRIKES})",
+    f"SUM({GAME_STRIKE_CHANCES})",
+    f"SUM({GAME_SPARES})",
+    f"SUM({GAME_SPARE_CHANCES})",
+    f"SUM({GAME_OPENS})",
+)
+
+
+SUMMARY_TABLES = {
+    "daily_stats": "date",
+    "monthly_stats": "month",
+}
+SUMMARY_SCHEMA = tuple(
+    f"CREATE TABLE IF NOT EXISTS {table} ("
+    f"{key} DATE NOT NULL PRIMARY KEY, "
+    + ", ".join(f"{column} INT UNSIGNED NOT NULL DEFAULT 0" for column in STATISTICS)
+    + ")"
+    for table, key in SUMMARY_TABLES.items()
+)
+SUMMARY_UPDATE = ", ".join(f"{column}=VALUES({column})" for column in STATISTICS)
+SUMMARY_AGGREGATES = tuple(f"MAX({column})" if column == "high" else f"SUM({column})" for column in STATISTICS)
+
+
+class Summary:
+    """
+        Daily and monthly totals of the `data` table, kept in `daily_stats` and `monthly_stats` so statistics read a
+        few summary rows instead of every game. A change to a game refreshes only the day and month it falls in.
+    """
+    @staticmethod
+    def month_of(day: t_date) -> tuple[t_date, t_date]:
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=31)).replace(day=1)
+
+    @staticmethod
+    def refresh(day: t_date) -> list[tuple[str, tuple]]:
+        start, end = Summary.month_of(day)
+        columns = ", ".join(STATISTICS)
+
+        return [
+            (f"INSERT INTO daily_stats (date, {columns}) "
+             f"SELECT ?, {', '.join(f'COALESCE({aggregate}, 0)' for aggregate in AGGREGATES)} "
+             f"FROM data WHERE date=? AND f10_s IS NOT NULL "
+             f"ON DUPLICATE KEY UPDATE {SUMMARY_UPDATE}", (day, day)),
+            ("DELETE FROM daily_stats WHERE date=? AND games=0", (day,)),
+            (f"INSERT INTO monthly_stats (month, {columns}) "
+             f"SELECT ?, {', '.join(f'COALESCE({aggregate}, 0)' for aggregate in SUMMARY_AGGREGATES)} "
+             f"FROM daily_stats WHERE date>=? AND date<? "
+             f"ON DUPLICATE KEY UPDATE {SUMMARY_UPDATE}", (start, start, end)),
+            ("DELETE FROM monthly_stats WHERE month=? AND games=0", (start,)),
+        ]
+
+    @staticmethod
+    def rebuild() -> list[tuple[str, tuple]]:
+        columns = ", ".join(STATISTICS)
+
+        return [(schema, ()) for schema in SUMMARY_SCHEMA] + [
+            ("DELETE FROM daily_stats", ()),
+            ("DELETE FROM monthly_stats", ()),
+            (f"INSERT INTO daily_stats (date, {columns}) "
+             f"SELECT date, {', '.join(AGGREGATES)} FROM data WHERE f10_s IS NOT NULL GROUP BY date", ()),
+            (f"INSERT INTO monthly_stats (month, {columns}) "
+             f"SELECT DATE_FORMAT(date, '%Y-%m-01'), {', '.join(SUMMARY_AGGREGATES)} "
+             f"FROM daily_stats GROUP BY DATE_FORMAT(date, '%Y-%m-01')", ()),
+        ]
+
+
+class Statistics:
+    WINDOWS = ("overall", "year", "month", "week")
+
+    @staticmethod
+    def window(name: str, day: t_date = None) -> tuple[t_date | None, t_date | None] | None:
+        """
+            Returns the [start, end) dates of the named window containing `day` (today if not given),
+            (None, None) for overall, or None if the window name is unknown.
+        """
+        if not day:
+            day = t_date.today()
+
+        if name == "overall":
+            return None, None
+        elif name == "year":
+            return t_date(day.year, 1, 1), t_date(day.year + 1, 1, 1)
+        elif name == "month":
+            start = day.replace(day=1)
+            return start, (start + timedelta(days=31)).replace(day=1)
+        elif name == "week":
+            start = day - timedelta(days=day.weekday())
+            return start, start + timedelta(days=7)
+
+        return None
+
+    @staticmethod
+    def search(start: t_date = None, end: t_date = None, key: str = "date") -> tuple[tuple, tuple]:
+        search_keys, search_values = (), ()
+        if start:
+            search_keys += (f"{key}>=",)
+            search_values += (start,)
+        if end:
+            search_keys += (f"{key}<",)
+            search_values += (end,)
+
+        return search_keys, search_values
+
+    @staticmethod
+    def summarize(row: tuple) -> dict:
+        stats = {key: int(value or 0) for key, value in zip(STATISTICS, row)}
+
+        stats["average"] = stats["pins"] / stats["games"] if stats["games"] else 0.0
+        stats["strike_pct"] = 100 * stats["strikes"] / stats["strike_chances"] if stats["strike_chances"] else 0.0
+        stats["spare_pct"] = 100 * stats["spares"] / stats["spare_chances"] if stats["spare_chances"] else 0.0
+
+        return stats
+
+    @staticmethod
+    def get_stats(interface, start: t_date = None, end: t_date = None, summary: bool = True) -> dict:
+        """
+            Computes statistics over completed games with `start` <= date < `end` as a single aggregate query.
+            Reads the monthly or daily summary table unless `summary` is False, which scans `data` instead.
+        """
+        if not summary:
+            search_keys, search_values = Statistics.search(start, end)
+            search_keys, search_values = ("f10_s!=",) + search_keys, (None,) + search_values
+
+            return Statistics.summarize(interface.get_aggregate("data", AGGREGATES, search_keys, search_values))
+
+        if (not start or start.day == 1) and (not end or end.day == 1):
+            table, key = "monthly_stats", "month"
+        else:
+            table, key = "daily_stats", "date"
+        search_keys, search_values = Statistics.search(start, end, key)
+
+        return Statistics.summarize(interface.get_aggregate(table, SUMMARY_AGGREGATES, search_keys, search_values))
@@ -9,11 +9,20 @@ Command Line Interface (CLI) for Bowling Score Tracker
 """
 
 from bowling import Interface
+from bowling import Game
+from bowling import GameSession
 from bowling import GameUtils
 from bowling import DateUtils
+from bowlingstats import Statistics
+from storageinterface import GoogleSheetInterface
+from profiler import CommandProfiler
+from profiler import CATEGORIES
 
-from dotenv import load_dotenv
+from functools import lru_cache
 from os import getenv
+from os.path import isfile
+from subprocess import PIPE
+from subprocess import Popen
 
 
 def print_banner(text : str, width : int, padding : str = "="):
@@ -31,9 +40,12 @@ def print_help_menu(option: str = None):
         print("Modifies an existing game. ")
         print("Usage:'m <date> <game>'")
     elif option == 'p':
-        print("Prints game or games on given date")
+        print("Prints game or games on given date, between two dates, or all games")
         print("Date in `month/day/year` format (ex `1/1/99` or `01/01/99` or `01/01/1999`")
         print("\tusage: 'p <date> <opt: game>'")
+        print("\tusage: 'p <start date> <end date> <opt: more>'")
+        print("\tusage: 'p all <opt: more>'")
+        print("\tmore: page output through $PAGER")
     elif option == 'd':
         print("Deletes game on give date")
         print("\tusage: 'd <date> <game> <opt_args...>'")
@@ -41,6 +53,10 @@ def print_help_menu(option: str = None):
         print("\t\tforce: bypass confirmation message")
         print("\t\tnofill: delete without moving games to fill game number")
         print("\t\tall: deletes all games on given date, ignores game input")
+    elif option == 's':
+        print("Prints statistics for completed games in a window containing given date, or today")
+        print("Windows: 'overall', 'year', 'month', 'week' (default 'overall')")
+        print("\tusage: 's <opt: window> <opt: date>'")
     elif option == 'o':
         print("Options Menu")
         print("\tusage: 'o <args>'")
@@ -51,6 +67,25 @@ def print_help_menu(option: str = None):
         print("\t\t\t\tforce: bypass confirmation message")
         print("\t\t\t\tnofill: delete without moving games to fill game number")
         print("\t\t\t\tall: deletes all games on given date, ignores game input")
+        print("\t\tpush: Copies games to the Google Sheets backup")
+        print("\t\tpull: Copies games from the Google Sheets backup")
+        print("\t\t\tusage: 'push <opt: date> <opt: game>' or 'pull <opt: date> <opt: game>'")
+        print("\t\tsync: Shows how far the background backup sync is behind")
+        print("\t\tdiff: Lists games that differ between the database and the backup")
+        print("\t\toffline: Switches to offline mode, saving games locally")
+        print("\t\tonline: Reconnects to the database and uploads games saved while offline")
+        print("\t\tsnapshot: Saves a local copy of all games for offline mode")
+        print("\t\timport: Loads games from a CSV file laid out like the database, replacing existing games")
+        print("\t\t\tusage: 'import <file path>'")
+        print("\t\texport: Writes games to a compact binary archive")
+        print("\t\t\tusage: 'export <file path> <opt: start date> <opt: end date>'")
+        print("\t\tstats: Shows per-query timings, row and commit counts and the slow query log")
+        print("\t\t\tusage: 'stats <opt: on <opt: slow ms> | off | reset | json <file path>>'")
+        print("\t\tprofile: Profiles each command, splitting its time into database, rendering and parsing")
+        print("\t\t\tusage: 'profile <opt: on | off>', or start with 'python maincli.py --profile'")
+        print("\t\tcache: Shows how often games were read from the game cache")
+        print("\t\trebuild: Regenerates daily and monthly statistics from all games")
+        print("\t\t\tusage: 'rebuild'")
     elif option == 'q':
         print("Quit Bowling Interface")
         print("\tusage: 'q'")
@@ -60,6 +95,7 @@ def print_help_menu(option: str = None):
         print("{:1} | {}".format("m", "modify game"))
         print("{:1} | {}".format("p", "print game"))
         print("{:1} | {}".format("d", "delete game"))
+        print("{:1} | {}".format("s", "statistics"))
         print("{:1} | {}".format("q", "quit"))
         print("{:1} | {}".format("?", "print this menu"))
         print("Call '? <cmd>' for help with specific commands")
@@ -68,26 +104,41 @@ def print_help_menu(option: str = None):
 def game_play(instance: Interface, date: str):
     # TODO: Deal with case when there game number is not continuous
 
-    game_number = instance.get_games_played(date) + 1
-    print(f" Date: {date}, Game Number: {game_number} ".center(60, "="))
-    instance.new_game(date)
+    session = instance.new_session(date, checkpoint=CHECKPOINT_INTERVAL)
+    print(f" Date: {date}, Game Number: {session.game} ".center(60, "="))
 
-    result = game_loop(instance, date, game_number)
+    game = session.game
+    result = game_loop(instance, session)
     if result:
-        frame_data = instance.get_game(date, game_number)[0][2:23]
-
-        frame_scores = GameUtils.calc_frame_scores(frame_data)
-        accum_scores = GameUtils.accumulate_scores(frame_scores)
-
-        for frame, score in enumerate(accum_scores, start=1):
-            instance.add_score(date, game_number, frame, score)
+        try:
+            session.finish()
+        except instance.errors() as err:
+            if not fall_back_offline(instance, err):
+                print("Game not saved")
+                return
+            session.finish()
 
+        if session.game != game:
+            print(f"Game {game} was taken by another scorer, saved as game {session.game}")
         print("Game Complete")
     else:
         print("Game Incomplete")
 
 
-def game_loop(instance: Interface, date: str, game: int) -> bool:
+def fall_back_offline(instance: Interface, err: Exception) -> bool:
+    """
+        Switches to offline mode after the database became unreachable mid-session. Returns False if it could not.
+    """
+    print(f"Lost the connection to the database: {err}")
+    if instance.offline or not instance.go_offline(OFFLINE_DB):
+        print("Offline mode is not available")
+        return False
+
+    print("Switched to offline mode, games are saved locally until the database is reachable")
+    return True
+
+
+def game_loop(instance: Interface, session: GameSession) -> bool:
     frame = 1
     throw = 1
     num_pins = 10
@@ -100,10 +151,10 @@ def game_loop(instance: Interface, date: str, game: int) -> bool:
             user_input = input(f"Frame {frame} Throw {throw} (m to modify previous score, q to quit)> ")
             user_input_val = GameUtils.score_to_num(user_input, num_pins)
             if user_input == 'm':
-                modify_loop(instance, date, game)
+                modify_loop(instance, session.date, session.game, session)
                 continue
             elif user_input == 'q':
-                instance.delete_game(date, game)
+                session.discard()
                 return False
             if user_input_val is None:
                 print("Invalid Input: '" + user_input + "'")
@@ -118,14 +169,14 @@ def game_loop(instance: Interface, date: str, game: int) -> bool:
         if 1 <= frame <= 9:
             if throw == 1:
                 if user_input_val == 10:
-                    instance.add_frame(date, game, frame, frame_score)
+                    session.add_frame(frame, frame_score)
                     frame += 1
                     num_pins = 10
                 else:
                     throw += 1
                     num_pins -= user_input_val
             else:
-                instance.add_frame(date, game, frame, frame_score)
+                session.add_frame(frame, frame_score)
                 frame += 1
                 throw -= 1
                 num_pins = 10
@@ -145,20 +196,25 @@ def game_loop(instance: Interface, date: str, game: int) -> bool:
                     num_pins -= user_input_val
 
                 if throw1_clear or throw2_clear:
-                    instance.add_frame(date, game, frame, frame_score)
+                    session.add_frame(frame, frame_score)
                     throw += 1
                 else:
-                    instance.add_frame(date, game, frame, frame_score)
+                    session.add_frame(frame, frame_score)
                     frame += 1
             elif throw == 3:
-                instance.add_frame(date, game, frame, frame_score)
+                session.add_frame(frame, frame_score)
                 frame += 1
     return True
 
 
-def modify_loop(instance: Interface, date: str, game: int):
-    if not instance.get_game(date, game):
-        print(f"Game {game} on {date} not found")
+def modify_loop(instance: Interface, date: str, game: int, session: GameSession = None):
+    stored = None
+    if not session:
+        result = instance.get_game(date, game)
+        if not result:
+            print(f"Game {game} on {date} not found")
+            return
+        stored = result[0]
 
     while 1:
         print("Modify> 'Frame Throw_1 Throw_2' or 'Frame Throw_1 Throw_2 Throw_3")
@@ -185,81 +241,194 @@ def modify_loop(instance: Interface, date: str, game: int):
         else:
             break
 
-    for throw, value in enumerate(data, start=1):
-        instance.modify_frame(date, game, frame, throw, value)
+    if session:
+        for throw, value in enumerate(data, start=1):
+            session.modify_frame(frame, throw, value)
+        return
 
-    # TODO: Score Recalculation after frame modification
+    instance.update_frame(date, game, frame, data, stored)
+
+
+def print_stats(stats: dict, title: str):
+    print_banner(title, 40)
+    print("{:<16}{:>12}".format("Games", stats["games"]))
+    print("{:<16}{:>12.2f}".format("Average", stats["average"]))
+    print("{:<16}{:>12}".format("High Game", stats["high"]))
+    print("{:<16}{:>11.2f}%".format("Strikes", stats["strike_pct"]))
+    print("{:<16}{:>11.2f}%".format("Spares", stats["spare_pct"]))
+    print("{:<16}{:>12}".format("Open Frames", stats["opens"]))
+
+
+def print_replayed(instance: Interface, replayed: int):
+    print(f"Back online, uploaded {replayed} games saved while offline")
+    for date, game, saved in instance.renumbered:
+        print(f"Game {game} on {DateUtils.normalize(date, '%m/%d/%y')} was taken on the server, saved as game {saved}")
+
+
+def print_profile(summary: dict):
+    """
+        Prints the wall time of each profiled command, split into time waiting for input, in the database, rendering,
+        parsing and everything else
+    """
+    print_banner(f"Profile since {summary['started']}", 100)
+    print("{:<20}{:>8}{:>12}".format("Command", "Count", "Wall ms")
+          + "".join("{:>12}".format(f"{category} ms") for category in CATEGORIES))
+    for command, total in sorted(summary["totals"].items(), key=lambda item: item[1]["wall_seconds"], reverse=True):
+        print("{:<20}{:>8}{:>12.1f}".format(command, total["count"], 1000 * total["wall_seconds"])
+              + "".join("{:>12.1f}".format(1000 * total[f"{category}_seconds"]) for category in CATEGORIES))
+
+
+def stop_profiler(profiler: CommandProfiler):
+    summary = profiler.stop()
+    folded, summary_path = profiler.save()
+
+    print_profile(summary)
+    print(f"Wrote collapsed stacks to '{folded}' and the summary to '{summary_path}'")
+
+
+def print_query_stats(stats: dict, limit: int = 20):
+    """
+        Prints the `limit` operations that took the most total time, then the slow query log
+    """
+    print_banner(f"Query Stats since {stats['started']}", 100)
+    print("{:<50}{:>8}{:>10}{:>9}{:>9}{:>9}{:>10}".format("Operation", "Count", "Total ms", "Mean ms", "p95 ms",
+                                                          "Max ms", "Rows"))
+    operations = sorted(stats["operations"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+    for operation, op_stats in operations[:limit]:
+        print("{:<50}{:>8}{:>10.1f}{:>9.2f}{:>9.2f}{:>9.2f}{:>10}".format(
+            operation if len(operation) <= 48 else operation[:45] + "...", op_stats["count"],
+            1000 * op_stats["seconds"], 1000 * op_stats["mean_seconds"], 1000 * op_stats["p95_seconds"],
+            1000 * op_stats["max_seconds"], op_stats["rows"]))
+    print(f"{sum(op_stats['commits'] for op_stats in stats['operations'].values())} commits")
+
+    if stats["slow_log"]:
+        print(f"Slowest operations over {stats['slow_ms']} ms (latest {len(stats['slow_log'])}):")
+    for entry in stats["slow_log"]:
+        print(f"\t{entry['time']} {1000 * entry['seconds']:.1f} ms {entry['operation'][:80]}")
+
+
+class GameRenderer:
+    """
+        Renders games in the `print_game_results` layout. Every cell is looked up from a table built on first use,
+        rows are joined into one string per page, and each page is written with a single call.
+        Cells are looked up by the game's raw values, so missing throws and scores are Game.MISSING.
+    """
+    HEADER = (
+        "{:8} {:4} {:4}".format("Date", "Game", "Scre") + " | "
+        + "{:<4}{:<4}{:<4}{:<4}{:<4}".format("1  -  ", "2  -  ", "3  -  ", "4  -  ", "5  -  ")
+        + "{:<4}{:<4}{:<4}{:<4}{:<7}".format("6  -  ", "7  -  ", "8  -  ", "9  - ", "10  -  -  ") + "| "
+        + "{:^3} {:^3} {:^3} {:^3} {:^3} ".format("1", "2", "3", "4", "5")
+        + "{:^3} {:^3} {:^3} {:^3} {:^3}".format("6", "7", "8", "9", "10") + "\n"
+        + "=" * 125 + "\n"
+    )
+    ROW = "{:8} {:>4} {:>4} | {}| {}\n"
 
+    def __init__(self, page_size: int = 50):
+        self.page_size = page_size
+        self.dates: dict = {}
 
-def print_game_results(data: list):
-    print("{:8} {:4} {:4}"
-          .format("Date", "Game", "Scre"), end=" ")
-    print("| ", end="")
-    print("{:<4}{:<4}{:<4}{:<4}{:<4}"
-          .format("1  -  ", "2  -  ", "3  -  ", "4  -  ", "5  -  "), end="")
-    print("{:<4}{:<4}{:<4}{:<4}{:<7}"
-          .format("6  -  ", "7  -  ", "8  -  ", "9  - ", "10  -  -  "), end="")
-    print("| ", end="")
-    print("{:^3} {:^3} {:^3} {:^3} {:^3} "
-          .format("1", "2", "3", "4", "5"), end="")
-    print("{:^3} {:^3} {:^3} {:^3} {:^3}"
-          .format("6", "7", "8", "9", "10"))
-
-    print("=" * 125)
-
-    for row in data:
-        head, mid, tail = row[:2], row[2:23], row[23:]
-
-        print("{:8} {:>4} {:>4}".format(
-            DateUtils.format_date(head[0], "%m/%d/%y"),
-            head[1],
-            int(tail[-1])
-        ), end=" ")
-
-        print("| ", end="")
-
-        for frame, scores in enumerate(zip(mid[:18:2], mid[1:18:2]), start=1):
-            if scores == (10, None):
-                print(f"x     ", end="")
-            elif sum(scores) == 10:
-                if not scores[0]:
-                    print(f"-  /  ", end="")
-                else:
-                    print(f"{scores[0]}  /  ", end="")
-            else:
-                if not scores[0]:
-                    print(f"-  ", end="")
-                else:
-                    print(f"{scores[0]}  ", end="")
-                if not scores[1]:
-                    print(f"-  ", end="")
-                else:
-                    print(f"{scores[1]}  ", end="")
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def frame_cell(first: int, second: int) -> str:
+        if (first, second) == (10, Game.MISSING):
+            return "x     "
+        elif first == Game.MISSING or second == Game.MISSING:
+            return " " * 6
+        elif first + second == 10:
+            return f"{first or '-'}  /  "
+
+        return f"{first or '-'}  {second or '-'}  "
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def tenth_cell(throws: tuple) -> str:
+        output = ""
         prev = None
-        for throw, score in enumerate(mid[18:22], start=1):
-            if score is None:
-                print("   ", end="")
+        for score in throws:
+            if score == Game.MISSING:
+                output += "   "
                 break
 
             if score == 10:
-                print(f"x  ", end="")
+                output += "x  "
             elif prev and prev + score == 10:
-                print(f"/  ", end="")
+                output += "/  "
             else:
-                if not score:
-                    print(f"-  ", end="")
-                else:
-                    print(f"{score}  ", end="")
+                output += f"{score or '-'}  "
             prev = score
 
-        print("| ", end="")
+        return output
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def score_cell(score: int) -> str:
+        return f"{score:>3} " if score > 0 else "--- "
+
+    def render_row(self, game: Game) -> str:
+        date = self.dates.get(game.date)
+        if date is None:
+            date = self.dates[game.date] = DateUtils.format_date(game.date, "%m/%d/%y")
+
+        values = game.values
+        frame_cell, score_cell = GameRenderer.frame_cell, GameRenderer.score_cell
+        frames = "".join([frame_cell(values[i], values[i + 1]) for i in range(0, 18, 2)])
+        scores = "".join([score_cell(values[i]) for i in range(21, 31)])
+        total = values[30]
+
+        return self.ROW.format(date, game.game, total if total >= 0 else "",
+                               frames + GameRenderer.tenth_cell((values[18], values[19], values[20])), scores)
+
+    def render(self, games) -> str:
+        return self.HEADER + "".join([self.render_row(game) for game in games])
+
+    def pages(self, games):
+        """
+            Yields the rendered games a page at a time, each page headed by the table header
+        """
+        page = []
+        for game in games:
+            page.append(self.render_row(game))
+            if len(page) == self.page_size:
+                yield self.HEADER + "".join(page)
+                page = []
+
+        if page:
+            yield self.HEADER + "".join(page)
+
+    def write(self, games, pager: bool = False) -> int:
+        """
+            Writes games page by page to stdout, or through $PAGER (`less` by default) if `pager` is set.
+            Returns the number of pages written.
+        """
+        process = None
+        output = None
+        if pager:
+            try:
+                process = Popen(getenv("PAGER", "less"), shell=True, stdin=PIPE, text=True)
+                output = process.stdin
+            except OSError:
+                process = None
+
+        written = 0
+        try:
+            for page in self.pages(games):
+                print(page, end="", file=output, flush=True)
+                written += 1
+        except BrokenPipeError:  # Pager closed before all pages were written
+            pass
+        finally:
+            if process:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                process.wait()
+
+        return written
 
-        for i, accumulated_score in enumerate(tail):
-            if not accumulated_score:
-                print(f"{'---'}", end=" ")
-            else:
-                print(f"{accumulated_score:>3}", end=" ")
-        print()
+
+def print_game_results(data: list):
+    print(GameRenderer().render(data), end="")
 
 
 class Validation:
@@ -281,15 +450,54 @@ class Validation:
 
     @staticmethod
     def valid_print_game(args: list) -> bool:
+        if args and args[-1] == "more":
+            if len(args) == 2 and args[0] == "all":
+                return True
+            if len(args) != 3 or GameUtils.is_int(args[1]):
+                return False
+            args = args[:-1]
+        if len(args) == 1 and args[0] == "all":
+            return True
         if len(args) > 2:
             print("df")
             return False
         if len(args) == 2 and not DateUtils.is_date(args[0]) and not GameUtils.is_int(args[0]):
             return False
+        if len(args) == 2 and not GameUtils.is_int(args[1]) and not DateUtils.is_date(args[1]):
+            return False
         if len(args) == 1 and not (DateUtils.is_date(args[0])):
             return False
         return True
 
+    @staticmethod
+    def valid_stats(args: list) -> bool:
+        if len(args) > 2:
+            return False
+        if len(args) >= 1 and args[0] not in Statistics.WINDOWS:
+            return False
+        if len(args) == 2 and not DateUtils.is_date(args[1]):
+            return False
+        return True
+
+    @staticmethod
+    def valid_sync(args: list) -> bool:
+        if len(args) > 2:
+            return False
+        if len(args) >= 1 and not DateUtils.is_date(args[0]):
+            return False
+        if len(args) == 2 and not GameUtils.is_int(args[1]):
+            return False
+        return True
+
+    @staticmethod
+    def valid_export(args: list) -> bool:
+        if len(args) == 1:
+            return True
+        elif len(args) == 3:
+            return DateUtils.is_date(args[1]) and DateUtils.is_date(args[2])
+
+        return False
+
     @staticmethod
     def valid_delete_game(args: list) -> bool:
         if len(args) != 2:
@@ -301,9 +509,16 @@ class Validation:
 
 TESTING_MODE = False
 DEBUG_MODE = False
+PAGE_SIZE = 50  # Games per page when printing ranges of games
+RECONNECT_INTERVAL = 30  # Seconds between reconnect attempts in offline mode
+OFFLINE_DB = "offline.db"  # Local snapshot and journal used in offline mode
+SLOW_QUERY_MS = 100  # Queries at least this slow are logged while query stats are on
+CHECKPOINT_INTERVAL = 0  # Frames between partial saves of a game in progress, 0 saves only finished games
 
 
 def main(args):
+    from dotenv import load_dotenv
+
     print_banner("Bowling Score Tracking", 60)
 
     if not load_dotenv("./.secrets/.env"):
@@ -311,151 +526,371 @@ def main(args):
         print("Exiting...")
         return
 
+    backend = getenv('STORAGE_BACKEND', 'mariadb')
     instance = Interface(
         getenv('MARIADB_USER'),
         getenv('MARIADB_PASS'),
-        getenv('MARIADB_DB'),
+        getenv('SQLITE_DB', 'bowling.db') if backend == 'sqlite' else getenv('MARIADB_DB'),
         getenv('SPREADSHEET_ID'),
-        getenv('SPREADSHEET_RANGE')
+        getenv('SPREADSHEET_RANGE'),
+        pool_size=int(getenv('MARIADB_POOL_SIZE', 1)),
+        backup=getenv('SPREADSHEET_BACKUP') == '1',
+        sync=getenv('SPREADSHEET_SYNC', '1') == '1',
+        backend=backend
     )
 
-    if not instance.valid:
-        # TODO: Offline Mode
-        # If GoogleSheetInterface errors due to internet connection issues
+    if getenv('QUERY_STATS') == '1':
+        instance.enable_stats(float(getenv('SLOW_QUERY_MS', SLOW_QUERY_MS)), getenv('SLOW_QUERY_LOG'))
 
-        print("Failed to Initialize Bowling Interface")
-        print("Errors:", instance.err)
-        for errors in instance.err:
-            print(errors)
-        print("Exiting...")
-        return 1
+    if instance.backup and not instance.backup.valid:
+        print("Failed to connect to the Google Sheets backup, continuing without it")
+        print("Errors:", instance.backup.err)
+
+    if not instance.interface.valid:
+        print("Failed to connect to the database")
+        print("Errors:", instance.interface.err)
+
+        if not instance.go_offline(OFFLINE_DB):
+            print("Exiting...")
+            return 1
+        print("Starting in offline mode, games are saved locally until the database is reachable")
+
+    profiler = CommandProfiler() if "--profile" in args[1:] else None
 
     while 1:  # Interface loop
+        if profiler:
+            profiler.end()
+
+        replayed = instance.go_online(RECONNECT_INTERVAL)
+        if replayed is not None:
+            print_replayed(instance, replayed)
+            print()
+
         # Input and Input Parsing
         user_input = input("Bowling (? for help)> ").strip()
         user_inputs = user_input.split()
         cmd = user_inputs[0] if user_inputs else ""
         args = user_inputs[1:]
+        if profiler:
+            profiler.begin(f"{cmd} {args[0]}" if cmd == 'o' and args else cmd, user_input)
+
+        try:
+            if cmd == 'q':
+                print("Quitting bowling data interface...")
+                try:
+                    instance.save_snapshot(OFFLINE_DB)
+                except instance.errors() as err:
+                    print(f"Could not update the offline snapshot: {err}")
+                instance.close()
+                if profiler:
+                    stop_profiler(profiler)
+                break
 
-        if cmd == 'q':
-            print("Quitting bowling data interface...")
-            break
-
-        elif cmd == '?':
-            if len(args) >= 1:
-                print_help_menu(args[0])
-            else:
-                print_help_menu()
+            elif cmd == '?':
+                if len(args) >= 1:
+                    print_help_menu(args[0])
+                else:
+                    print_help_menu()
 
-        elif cmd == 'n':
-            if not Validation.valid_new_game(args):
-                print(f"Invalid Input: '{user_input}'\n")
-                return 0
+            elif cmd == 'n':
+                if not Validation.valid_new_game(args):
+                    print(f"Invalid Input: '{user_input}'\n")
+                    return 0
 
-            if len(args) == 0:
-                date = DateUtils.today()
-            else:
-                date = DateUtils.format_date(DateUtils.to_date(args[0]))
+                if len(args) == 0:
+                    date = DateUtils.today()
+                else:
+                    date = DateUtils.normalize(args[0])
 
-            game_play(instance, date)
+                game_play(instance, date)
 
-        elif cmd == 'm':
-            if not Validation.valid_modify_game(args):
-                print(f"Invalid Input: '{user_input}'\n")
-                continue
+            elif cmd == 'm':
+                if not Validation.valid_modify_game(args):
+                    print(f"Invalid Input: '{user_input}'\n")
+                    continue
 
-            date = DateUtils.format_date(DateUtils.to_date(args[0]))
-            game = GameUtils.to_int(args[1])
+                date = DateUtils.normalize(args[0])
+                game = GameUtils.to_int(args[1])
 
-            modify_loop(instance, date, game)
+                modify_loop(instance, date, game)
 
-        elif cmd == 'p':
-            # TODO: Make a print all
+            elif cmd == 'p':
+                if not Validation.valid_print_game(args):
+                    print(f"Invalid Input: '{user_input}'\n")
+                    continue
 
-            if not Validation.valid_print_game(args):
-                print(f"Invalid Input: '{user_input}'\n")
-                continue
+                paged = bool(args) and args[-1] == "more"
+                if paged:
+                    args = args[:-1]
+
+                if args and args[0] == "all":
+                    if not GameRenderer(PAGE_SIZE).write(instance.iter_games(), paged):
+                        print("No games played\n")
+                        continue
+                elif len(args) == 2 and not GameUtils.is_int(args[1]):
+                    start = DateUtils.normalize(args[0])
+                    end = DateUtils.normalize(args[1])
+
+                    if not GameRenderer(PAGE_SIZE).write(instance.iter_games(start, end), paged):
+                        print(f"No games played between {start} and {end}\n")
+                        continue
+                elif len(args) == 0:
+                    date = DateUtils.today()
+
+                    result = instance.get_game(date)
+                    if not result:
+                        print(f"No games played on {date}\n")
+                        continue
 
-            if len(args) == 0:
-                date = DateUtils.today()
+                    print_game_results(result)
+                elif len(args) == 1:
+                    date = DateUtils.normalize(args[0])
 
-                result = instance.get_game(date)
-                if not result:
-                    print(f"No games played on {date}\n")
+                    result = instance.get_game(date)
+                    if not result:
+                        print(f"No games played on {date}\n")
+                        continue
+
+                    print_game_results(result)
+                elif len(args) == 2:
+                    date = DateUtils.normalize(args[0])
+                    game = GameUtils.to_int(args[1])
+
+                    result = instance.get_game(date, game)
+                    if not result:
+                        games_played = instance.get_games_played(date)
+                        date = DateUtils.normalize(args[0], "%m/%d/%y")
+                        if games_played == 0:
+                            print(f"No games played on {date}\n")
+                        elif games_played == 1:
+                            print(f"Only {games_played} game played on {date}\n")
+                        else:
+                            print(f"Only {games_played} games played on {date}\n")
+                        continue
+
+                    print_game_results(result)
+
+            elif cmd == 's':
+                # TODO: Matplotlib for graphs
+
+                if not Validation.valid_stats(args):
+                    print(f"Invalid Input: '{user_input}'\n")
                     continue
 
-                print_game_results(result)
-            elif len(args) == 1:
-                date = DateUtils.format_date(DateUtils.to_date(args[0]))
+                window = args[0] if args else "overall"
+                date = DateUtils.normalize(args[1]) if len(args) == 2 else None
 
-                result = instance.get_game(date)
-                if not result:
-                    print(f"No games played on {date}\n")
+                stats = instance.get_stats(window, date)
+                if not stats["games"]:
+                    print(f"No completed games in {window} window\n")
                     continue
 
-                print_game_results(result)
-            elif len(args) == 2:
-                date = DateUtils.format_date(DateUtils.to_date(args[0]))
-                game = GameUtils.to_int(args[1])
-
-                result = instance.get_game(date, game)
-                if not result:
-                    games_played = instance.get_games_played(date)
-                    date = DateUtils.format_date(DateUtils.to_date(args[0]), "%m/%d/%y")
-                    if games_played == 0:
-                        print(f"No games played on {date}\n")
-                    elif games_played == 1:
-                        print(f"Only {games_played} game played on {date}\n")
-                    else:
-                        print(f"Only {games_played} games played on {date}\n")
-                    continue
+                print_stats(stats, f"Statistics ({window})")
 
-                print_game_results(result)
+            elif cmd == 'o':
+                # TODO: Option Menu
+                # Move delete menu here
+                # Add enabling debug mode
 
-        elif cmd == 's':
-            # TODO: Statistics Menu
-            # Select Overall, Year, Month, Week for data
-            # Data: Spare completion percent, strike percent, average score, highest score
-            # Matplotlib for graphs
+                option_cmd = args[0]
+                option_args = args[1:]
 
-            pass
+                if option_cmd == 'd':
+                    if not Validation.valid_delete_game(option_args):
+                        print(f"Invalid Input: '{user_input}'\n")
+                        continue
 
-        elif cmd == 'o':
-            # TODO: Option Menu
-            # Move delete menu here
-            # Add enabling debug mode
+                    date = DateUtils.normalize(option_args[0])
+                    game = GameUtils.to_int(option_args[1])
 
-            option_cmd = args[0]
-            option_args = args[1:]
+                    if instance.delete_game(date, game):
+                        print(f"Deleted game {game} on {date}")
+                    else:
+                        print("Game doesn't exist, no games deleted")
+                        continue
+
+                elif option_cmd in ('push', 'pull'):
+                    if not Validation.valid_sync(option_args):
+                        print(f"Invalid Input: '{user_input}'\n")
+                        continue
+                    if instance.offline:
+                        print("Backup is not available in offline mode\n")
+                        continue
+                    if not instance.backup:
+                        print("Backup is not enabled (set SPREADSHEET_BACKUP=1)\n")
+                        continue
+                    if not instance.backup.valid:
+                        print("Backup is not reachable\n")
+                        continue
+
+                    date = DateUtils.normalize(option_args[0]) if option_args else None
+                    game = GameUtils.to_int(option_args[1]) if len(option_args) == 2 else None
+
+                    try:
+                        if option_cmd == 'push':
+                            print(f"Pushed {instance.push_data(date, game)} games to backup")
+                        else:
+                            print(f"Pulled {instance.pull_data(date, game)} games from backup")
+                    except GoogleSheetInterface.errors() as err:
+                        print(f"Backup request failed: {err}\n")
+                        continue
+
+                elif option_cmd == 'sync':
+                    if not instance.sync_worker:
+                        print("Background sync is not running\n")
+                        continue
+
+                    queued, lag = instance.sync_worker.get_lag()
+                    print(f"{queued} games waiting to sync, oldest change {lag}s ago")
+                    print(f"{instance.sync_worker.synced} games synced this session")
+                    if instance.sync_worker.failures:
+                        print(f"{instance.sync_worker.failures} failed attempts, last error: "
+                              f"{instance.sync_worker.last_error}")
+
+                elif option_cmd == 'diff':
+                    if instance.offline:
+                        print("Backup is not available in offline mode\n")
+                        continue
+                    if not instance.backup:
+                        print("Backup is not enabled (set SPREADSHEET_BACKUP=1)\n")
+                        continue
+                    if not instance.backup.valid:
+                        print("Backup is not reachable\n")
+                        continue
+
+                    try:
+                        differences = instance.check_diff()
+                    except GoogleSheetInterface.errors() as err:
+                        print(f"Backup request failed: {err}\n")
+                        continue
+                    if not differences:
+                        print("Database and backup match")
+                    for date, game in differences:
+                        print(f"Game {game} on {DateUtils.format_date(date, '%m/%d/%y')} differs")
+
+                elif option_cmd == 'offline':
+                    if instance.offline:
+                        print("Already in offline mode\n")
+                        continue
+
+                    instance.save_snapshot(OFFLINE_DB)
+                    if instance.go_offline(OFFLINE_DB):
+                        print("Offline mode, games are saved locally")
+
+                elif option_cmd == 'online':
+                    replayed = instance.go_online()
+                    if replayed is None:
+                        print("Database is not reachable, still offline\n")
+                        continue
+                    print_replayed(instance, replayed)
+
+                elif option_cmd == 'snapshot':
+                    print(f"Offline snapshot updated, {instance.save_snapshot(OFFLINE_DB)} games copied")
+
+                elif option_cmd == 'import':
+                    file_path = " ".join(option_args)
+                    if not isfile(file_path):
+                        print(f"File not found: '{file_path}'\n")
+                        continue
+                    if instance.offline:
+                        print("Importing is not available in offline mode\n")
+                        continue
+
+                    imported, rejected = instance.import_csv(
+                        file_path, lambda lines: print(f"\r{lines} lines read", end="", flush=True)
+                    )
+                    print(f"\nImported {imported} games")
+                    if rejected:
+                        print(f"Skipped {len(rejected)} invalid games on lines: {', '.join(map(str, rejected[:20]))}"
+                              + (" ..." if len(rejected) > 20 else ""))
+
+                elif option_cmd == 'export':
+                    if not Validation.valid_export(option_args):
+                        print(f"Invalid Input: '{user_input}'\n")
+                        continue
+
+                    start, end = None, None
+                    if len(option_args) == 3:
+                        start = DateUtils.normalize(option_args[1])
+                        end = DateUtils.normalize(option_args[2])
+
+                    print(f"Exported {instance.export_archive(option_args[0], start, end)} games to '{option_args[0]}'")
+
+                elif option_cmd == 'stats':
+                    sub_cmd = option_args[0] if option_args else ""
+                    if sub_cmd == 'on':
+                        slow_ms = SLOW_QUERY_MS
+                        if len(option_args) > 1 and GameUtils.is_int(option_args[1]):
+                            slow_ms = int(option_args[1])
+                        instance.enable_stats(slow_ms, getenv('SLOW_QUERY_LOG'))
+                        print(f"Recording query stats, logging queries over {slow_ms} ms")
+                    elif sub_cmd == 'off':
+                        instance.disable_stats()
+                        print("Stopped recording query stats")
+                    elif not instance.stats:
+                        print("Query stats are off, enable with 'o stats on'\n")
+                        continue
+                    elif sub_cmd == 'reset':
+                        instance.stats.reset()
+                        print("Cleared query stats")
+                    elif sub_cmd == 'json' and len(option_args) == 2:
+                        instance.stats.dump(option_args[1])
+                        print(f"Wrote query stats to '{option_args[1]}'")
+                    elif not sub_cmd:
+                        print_query_stats(instance.stats.get_stats())
+                    else:
+                        print(f"Invalid Input: '{user_input}'\n")
+                        continue
+
+                elif option_cmd == 'profile':
+                    if option_args == ['on']:
+                        if profiler:
+                            print("Already profiling\n")
+                            continue
+                        profiler = CommandProfiler()
+                        print("Profiling commands, 'o profile off' to stop and save")
+                    elif option_args == ['off']:
+                        if not profiler:
+                            print("Not profiling\n")
+                            continue
+                        stop_profiler(profiler)
+                        profiler = None
+                    elif option_args:
+                        print(f"Invalid Input: '{user_input}'\n")
+                        continue
+                    elif not profiler:
+                        print("Profiling is off, enable with 'o profile on'\n")
+                        continue
+                    else:
+                        print_profile(profiler.get_summary())
 
-            if option_cmd == 'd':
-                if not Validation.valid_delete_game(option_args):
-                    print(f"Invalid Input: '{user_input}'\n")
-                    continue
+                elif option_cmd == 'cache':
+                    cache = instance.cache
+                    lookups = cache.hits + cache.misses
+                    print(f"{len(cache.games)} games and {len(cache.dates)} dates cached")
+                    print(f"{cache.hits} hits, {cache.misses} misses"
+                          + (f" ({100 * cache.hits / lookups:.1f}% hit rate)" if lookups else ""))
 
-                date = DateUtils.format_date(DateUtils.to_date(option_args[0]))
-                game = GameUtils.to_int(option_args[1])
+                elif option_cmd == 'rebuild':
+                    instance.rebuild_summary()
+                    print("Rebuilt daily and monthly statistics")
 
-                if instance.delete_game(date, game):
-                    print(f"Deleted game {game} on {date}")
                 else:
-                    print("Game doesn't exist, no games deleted")
+                    print(f"Invalid Input: '{user_input}'\n")
                     continue
 
-            else:
-                print(f"Invalid Input: '{user_input}'\n")
-                continue
+            elif cmd == 't':
+                # print("Nothing is being tested at the moment")
 
-        elif cmd == 't':
-            # print("Nothing is being tested at the moment")
+                game_data = instance.get_game(DateUtils.normalize("1/25/23"))
+                print(game_data[1].throws)
+                print(game_data[1].frame_scores)
 
-            game_data = instance.get_game(DateUtils.format_date(DateUtils.to_date("1/25/23")))
-            frame_scores = game_data[1][2:23]
-            print(frame_scores)
-            print(GameUtils.calc_frame_scores(frame_scores))
+            else:
+                print(f"Invalid Input: '{user_input}'")
+        except instance.errors() as err:
+            fall_back_offline(instance, err)
 
-        else:
-            print(f"Invalid Input: '{user_input}'")
         print()
 
 
@@ -0,0 +1,190 @@
+"""
+
+profiler.py
+Written by: William Lin
+
+Description:
+Sampling profiler for the commands of the Bowling Score Tracker CLI
+
+While a command runs, a background thread samples the stack of the thread running it every `interval` seconds.
+Each sample is charged to the first category found from the innermost frame out (waiting for input, database,
+rendering, parsing, else other), which splits the command's wall time, and is added to collapsed stacks
+("frame;frame;... count" lines) that flamegraph.pl or speedscope turn into flame graphs.
+
+"""
+
+import builtins
+import json
+import sys
+from collections import Counter
+from datetime import datetime
+from os import makedirs
+from os.path import basename
+from os.path import join
+from threading import Event
+from threading import Lock
+from threading import Thread
+from threading import get_ident
+from time import perf_counter
+
+PROFILE_INTERVAL = 0.001  # Seconds between samples
+PROFILE_DIR = "profiles"
+CATEGORIES = ("input", "db", "render", "parse", "other")
+
+# A frame belongs to a category if its file path contains one of the paths or its qualified name starts with one
+# of the names
+DB_PATHS = ("storageinterface.py", "mariadb", "googleapiclient", "httplib2", "sqlite3")
+RENDER_NAMES = ("GameRenderer.", "print_")
+PARSE_NAMES = ("DateUtils.", "GameUtils.", "Validation.")
+PARSE_PATHS = ("dateutil", "_strptime.py")
+
+
+class CommandProfiler:
+    """
+        Profiles the commands run between begin and end on the thread that created it. While profiling,
+        builtins.input is wrapped so time spent waiting for the user is told apart from work; stop restores it.
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL, directory: str = PROFILE_DIR):
+        self.interval = interval
+        self.directory = directory
+        self.thread_id = get_ident()
+        self.started = datetime.now()
+        self.lock = Lock()
+        self.stopped = Event()
+        self.current: dict | None = None  # Command being profiled
+        self.commands: list[dict] = []
+        self.stacks: Counter[str] = Counter()
+        self.labels: dict = {}  # code -> (frame label, category or None)
+
+        self.builtin_input = builtins.input
+        self.input_code = self.__input.__func__.__code__
+        builtins.input = self.__input
+
+        self.sampler = Thread(target=self.__sample_loop, name="CommandProfiler", daemon=True)
+        self.sampler.start()
+
+    def begin(self, command: str, line: str = ""):
+        """
+            Starts profiling `command` (the name it is reported under, ex. "p" or "o stats"), ending the previous one
+        """
+        self.end()
+        with self.lock:
+            self.current = {"command": command, "line": line, "start": perf_counter(), "samples": Counter()}
+
+    def end(self) -> dict | None:
+        """
+            Stops profiling the current command. Returns its record: wall time and its split by category.
+        """
+        with self.lock:
+            current, self.current = self.current, None
+        if not current:
+            return None
+
+        wall = perf_counter() - current["start"]
+        samples = current["samples"]
+        total = sum(samples.values())
+
+        record = {"command": current["command"], "line": current["line"], "wall_seconds": wall, "samples": total}
+        for category in CATEGORIES:
+            if total:
+                record[f"{category}_seconds"] = wall * samples[category] / total
+            else:  # Shorter than one interval
+                record[f"{category}_seconds"] = wall if category == "other" else 0.0
+        self.commands.append(record)
+        return record
+
+    def stop(self) -> dict:
+        """
+            Ends profiling, restores builtins.input and returns the summary
+        """
+        self.end()
+        self.stopped.set()
+        self.sampler.join()
+        builtins.input = self.builtin_input
+
+        return self.get_summary()
+
+    def get_summary(self) -> dict:
+        """
+            Returns the recorded commands and their totals by command name
+        """
+        totals: dict[str, dict] = {}
+        for record in self.commands:
+            total = totals.setdefault(record["command"], dict.fromkeys(
+                ["count", "wall_seconds"] + [f"{category}_seconds" for category in CATEGORIES], 0
+            ))
+            total["count"] += 1
+            for key in total:
+                if key != "count":
+                    total[key] += record[key]
+
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "interval": self.interval,
+            "totals": totals,
+            "commands": self.commands,
+        }
+
+    def save(self) -> tuple[str, str]:
+        """
+            Writes the collapsed stacks, rooted at the command name, and the JSON summary to `directory`.
+            Returns their paths.
+        """
+        makedirs(self.directory, exist_ok=True)
+        name = join(self.directory, f"profile-{self.started:%Y%m%d-%H%M%S}")
+
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        with open(f"{name}.folded", "w") as file:
+            for stack, count in stacks:
+                file.write(f"{stack} {count}\n")
+
+        with open(f"{name}.json", "w") as file:
+            json.dump(self.get_summary(), file, indent=2)
+
+        return f"{name}.folded", f"{name}.json"
+
+    def __input(self, prompt: str = "") -> str:
+        return self.builtin_input(prompt)
+
+    def __sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            with self.lock:
+                if not self.current or frame is None:
+                    continue
+
+                stack, category = [], None
+                while frame:
+                    label, frame_category = self.__label(frame.f_code)
+                    stack.append(label)
+                    if category is None:
+                        category = frame_category
+                    frame = frame.f_back
+
+                stack.append(self.current["command"])
+                self.stacks[";".join(reversed(stack))] += 1
+                self.current["samples"][category or "other"] += 1
+
+    def __label(self, code) -> tuple[str, str | None]:
+        cached = self.labels.get(code)
+        if cached:
+            return cached
+
+        name = getattr(code, "co_qualname", code.co_name)
+        path = code.co_filename
+        if code is self.input_code:
+            category = "input"
+        elif any(part in path for part in DB_PATHS):
+            category = "db"
+        elif basename(path) == "maincli.py" and name.startswith(RENDER_NAMES):
+            category = "render"
+        elif name.startswith(PARSE_NAMES) or any(part in path for part in PARSE_PATHS):
+            category = "parse"
+        else:
+            category = None
+
+        label = "input" if category == "input" else f"{basename(path)}:{name}"
+        self.labels[code] = label, category
+        return label, category
@@ -6,7 +6,136 @@ Written by: William Lin
 Description:
 Setup file for Bowling Score Tracker
 
+Creates or upgrades the MariaDB schema in place. Each migration runs once and is recorded in `schema_version`.
+The embedded SQLite backend (STORAGE_BACKEND=sqlite) creates its schema itself and needs no setup.
+    usage: 'python setup.py'         applies pending migrations
+           'python setup.py status'  prints the current schema version
+
 Requires setting up Google API services
 
 """
 
+from bowling import DATA_SCHEMA
+from bowling import SYNC_SCHEMA
+from bowling import SYNC_INDEX
+from bowlingstats import Summary
+from storageinterface import MariaDBInterface
+from storageinterface import InterfaceError
+
+VERSION_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS schema_version ("
+    "version INT NOT NULL PRIMARY KEY, "
+    "description VARCHAR(255) NOT NULL, "
+    "applied TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+    ")"
+)
+
+
+def get_indexes(interface: MariaDBInterface, database: str, table: str) -> set[str]:
+    indexes = interface.get_aggregate("information_schema.STATISTICS", ("GROUP_CONCAT(DISTINCT INDEX_NAME)",),
+                                      ("TABLE_SCHEMA", "TABLE_NAME"), (database, table))[0]
+
+    return set(indexes.split(",")) if indexes else set()
+
+
+def create_data_table(interface: MariaDBInterface, database: str):
+    interface.run_statements([(DATA_SCHEMA, ())])
+
+
+def add_data_keys(interface: MariaDBInterface, database: str):
+    """
+        Installs created before the schema was managed have no keys on `data`, so every per-game statement scans it
+    """
+    indexes = get_indexes(interface, database, "data")
+
+    statements = []
+    if "PRIMARY" not in indexes:
+        duplicates = interface.get_aggregate("data", ("COUNT(*) - COUNT(DISTINCT date, game)",))[0]
+        if duplicates:
+            raise InterfaceError(f"{duplicates} duplicate (date, game) rows in `data`, remove them and rerun setup")
+        statements.append(("ALTER TABLE data ADD PRIMARY KEY (date, game)", ()))
+    if "data_score" not in indexes:
+        statements.append(("ALTER TABLE data ADD INDEX data_score (f10_s, date)", ()))
+
+    if statements:
+        interface.run_statements(statements)
+
+
+def create_summary_tables(interface: MariaDBInterface, database: str):
+    interface.run_statements(Summary.rebuild())
+
+
+def create_sync_queue(interface: MariaDBInterface, database: str):
+    interface.run_statements([(SYNC_SCHEMA, ()), (SYNC_INDEX, ())])
+
+
+MIGRATIONS = (
+    (1, "Create data table", create_data_table),
+    (2, "Add (date, game) primary key and score index to data", add_data_keys),
+    (3, "Create and fill daily/monthly summary tables", create_summary_tables),
+    (4, "Create backup sync queue", create_sync_queue),
+)
+
+
+def get_version(interface: MariaDBInterface) -> int:
+    interface.run_statements([(VERSION_SCHEMA, ())])
+
+    return interface.get_aggregate("schema_version", ("COALESCE(MAX(version), 0)",))[0]
+
+
+def bootstrap(interface: MariaDBInterface, database: str) -> list[int]:
+    """
+        Applies every migration newer than the recorded schema version, in order. Returns the versions applied.
+    """
+    version = get_version(interface)
+
+    applied = []
+    for number, description, migration in MIGRATIONS:
+        if number <= version:
+            continue
+
+        migration(interface, database)
+        interface.add_row("schema_version", ("version", "description"), (number, description))
+        applied.append(number)
+
+    return applied
+
+
+def main(args):
+    from dotenv import load_dotenv
+    from os import getenv
+
+    if not load_dotenv("./.secrets/.env"):
+        print("Failed to get .env")
+        print("Exiting...")
+        return 1
+
+    database = getenv("MARIADB_DB")
+    interface = MariaDBInterface(getenv("MARIADB_USER"), getenv("MARIADB_PASS"), database)
+    if not interface.valid:
+        print("Failed to connect to MariaDB")
+        print("Errors:", interface.err)
+        return 1
+
+    if len(args) > 1 and args[1] == "status":
+        version = get_version(interface)
+        print(f"Schema version {version} of {MIGRATIONS[-1][0]}")
+        return 0
+
+    try:
+        applied = bootstrap(interface, database)
+    except InterfaceError as err:
+        print(err)
+        return 1
+
+    if not applied:
+        print(f"Schema is up to date (version {MIGRATIONS[-1][0]})")
+    for number in applied:
+        print(f"Applied migration {number}: {MIGRATIONS[number - 1][1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    from sys import argv
+
+    main(argv)
@@ -12,56 +12,264 @@ Uses:
 
 """
 
-import csv
+import json
+from abc import ABC
+from abc import abstractmethod
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import date as t_date
+from datetime import datetime as t_datetime
+from functools import wraps
+from importlib import import_module
+from itertools import islice
 from os.path import exists as token_exists
+from queue import Queue
+from threading import Lock
+from threading import RLock
+from time import perf_counter
+
+
+class Driver:
+    """
+        Stands in for a backend's driver module and imports it on first use, so only the backends that are actually
+        configured pay for loading their driver
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute: str):
+        if self.module is None:
+            self.module = import_module(self.name)
+        return getattr(self.module, attribute)
+
+
+mariadb = Driver("mariadb")
+sqlite3 = Driver("sqlite3")
+
+
+def read_csv_chunks(file_path: str, parse=None, chunk_size: int = 1000, header: bool = True):
+    """
+        Streams the CSV at `file_path` as (rows, rejected, lines read) every `chunk_size` lines, so a file of any
+        size is never held in memory. `parse` converts a line's cells into the row to store, or None to reject it
+        (rejected holds the 1-based line numbers). With `header` the first line is skipped.
+    """
+    import csv
+
+    with open(file_path, newline="") as file:
+        reader = csv.reader(file)
+        line = 0
+        if header:
+            next(reader, None)
+            line = 1
+
+        while 1:
+            lines = list(islice(reader, chunk_size))
+            if not lines:
+                return
+
+            rows, rejected = [], []
+            for cells in lines:
+                line += 1
+                row = parse(cells) if parse else cells
+                if row is None:
+                    rejected.append(line)
+                else:
+                    rows.append(row)
+
+            yield rows, rejected, line
+
+
+class QueryStats:
+    """
+        Latency histograms, row and commit counts per operation (a SQL statement, or a Sheets request type) and a
+        log of operations slower than `slow_ms`, also appended as JSON lines to `slow_log_path` if given.
+        Collected by interfaces passed to their `enable_stats`; an interface without stats runs uninstrumented.
+        Histogram buckets are powers of two microseconds, a bucket counts latencies up to its bound.
+    """
+    SLOW_LOG_SIZE = 100
+
+    def __init__(self, slow_ms: float = None, slow_log_path: str = None):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.lock = Lock()  # Operations are recorded from the sync worker as well
+        self.operations: dict[str, dict] = {}
+        self.slow_log: deque[dict] = deque(maxlen=self.SLOW_LOG_SIZE)
+        self.started = t_datetime.now()
+
+    def record(self, operation: str, seconds: float, rows: int = 0, commits: int = 0, values=None):
+        micros = int(seconds * 1e6)
+        with self.lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = {
+                    "count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "commits": 0, "histogram": [0] * 32
+                }
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["rows"] += rows
+            stats["commits"] += commits
+            stats["histogram"][min(micros.bit_length(), 31)] += 1
+
+        if self.slow_ms is not None and seconds * 1000 >= self.slow_ms:
+            self.__log_slow(operation, seconds, rows, values)
+
+    def instrument(self, function, describe):
+        """
+            Wraps `function` to record each call. `describe(args, kwargs, result)` returns the call's
+            (operation, rows, commits, values).
+        """
+        @wraps(function)
+        def instrumented(*args, **kwargs):
+            start = perf_counter()
+            result = function(*args, **kwargs)
+            elapsed = perf_counter() - start
+
+            operation, rows, commits, values = describe(args, kwargs, result)
+            self.record(operation, elapsed, rows, commits, values)
+            return result
+
+        return instrumented
+
+    @staticmethod
+    def attach(interface, describers: dict):
+        """
+            Instruments the methods named in `describers` on `interface` itself, shadowing the class methods,
+            so detach restores them and other interfaces are unaffected
+        """
+        for name, describe in describers.items():
+            setattr(interface, name, interface.stats.instrument(getattr(type(interface), name).__get__(interface),
+                                                                describe))
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+    @staticmethod
+    def detach(interface, describers: dict):
+        for name in describers:
+            vars(interface).pop(name, None)
+
+    def reset(self):
+        with self.lock:
+            self.operations.clear()
+            self.slow_log.clear()
+            self.started = t_datetime.now()
+
+    def get_stats(self) -> dict:
+        """
+            Returns a JSON-serializable copy of the stats, each operation with its mean and approximate percentiles
+        """
+        with self.lock:
+            operations = {operation: dict(stats, histogram=list(stats["histogram"]))
+                          for operation, stats in self.operations.items()}
+            slow_log = list(self.slow_log)
+
+        for stats in operations.values():
+            histogram = stats.pop("histogram")
+            stats["mean_seconds"] = stats["seconds"] / stats["count"]
+            for percentile in (50, 95, 99):
+                stats[f"p{percentile}_seconds"] = min(self.__percentile(histogram, stats["count"], percentile),
+                                                      stats["max_seconds"])
+            stats["histogram_us"] = {str(2 ** bucket if bucket else 0): count
+                                     for bucket, count in enumerate(histogram) if count}
+
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "slow_ms": self.slow_ms,
+            "operations": operations,
+            "slow_log": slow_log,
+        }
+
+    def dump(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.get_stats(), file, indent=2)
 
-import mariadb
+    @staticmethod
+    def __percentile(histogram: list[int], count: int, percentile: int) -> float:
+        """
+            Upper bound in seconds of the bucket holding the given percentile
+        """
+        rank = count * percentile / 100
+        seen = 0
+        for bucket, bucket_count in enumerate(histogram):
+            seen += bucket_count
+            if seen >= rank:
+                return (2 ** bucket if bucket else 0) / 1e6
+        return 0.0
+
+    def __log_slow(self, operation: str, seconds: float, rows: int, values):
+        entry = {
+            "time": t_datetime.now().isoformat(timespec="milliseconds"),
+            "operation": operation,
+            "seconds": seconds,
+            "rows": rows,
+            "values": repr(values)[:200] if values is not None else None,
+        }
+        with self.lock:
+            self.slow_log.append(entry)
+
+        if self.slow_log_path:
+            try:
+                with open(self.slow_log_path, "a") as file:
+                    file.write(json.dumps(entry) + "\n")
+            except OSError:
+                pass
 
 
 class GoogleSheetInterface:
-    def __init__(self, spreadsheet_id: str, sheet_name: str):
+    BATCH_SIZE = 500  # Rows per batch request
+
+    def __init__(self, spreadsheet_id: str, sheet_name: str, width: int = 26, header_rows: int = 1,
+                 key_width: int = 2, sheet=None):
         self.valid = True
         self.err = None
-
-        creds = None
-        scope = ['https://www.googleapis.com/auth/spreadsheets']
-        if token_exists(".secrets/token.json"):
-            creds = Credentials.from_authorized_user_file(
-                ".secrets/token.json",
-                scope
-            )
-
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    ".secrets/credentials.json",
+        self.width = width
+        self.header_rows = header_rows
+        self.key_width = key_width
+        self.keys: dict[tuple, int] = {}
+        self.blank_rows: list[int] = []
+        self.sheet_id: int | None = None
+        self.stats: QueryStats | None = None
+
+        if sheet is None:
+            from google.auth.transport.requests import Request
+            from google.oauth2.credentials import Credentials
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            from googleapiclient.discovery import build
+
+            creds = None
+            scope = ['https://www.googleapis.com/auth/spreadsheets']
+            if token_exists(".secrets/token.json"):
+                creds = Credentials.from_authorized_user_file(
+                    ".secrets/token.json",
                     scope
                 )
-                creds = flow.run_local_server(port=0)
-            with open(".secrets/token.json", 'w') as token:
-                token.write(creds.to_json())
-
-        service = build(
-            "sheets",
-            "v4",
-            credentials=creds
-        )
+
+            if not creds or not creds.valid:
+                if creds and creds.expired and creds.refresh_token:
+                    creds.refresh(Request())
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(
+                        ".secrets/credentials.json",
+                        scope
+                    )
+                    creds = flow.run_local_server(port=0)
+                with open(".secrets/token.json", 'w') as token:
+                    token.write(creds.to_json())
+
+            service = build(
+                "sheets",
+                "v4",
+                credentials=creds
+            )
+            sheet = service.spreadsheets()
 
         self.spreadsheet_id = spreadsheet_id
         self.sheet_range = sheet_name
-        self.sheet = service.spreadsheets()
+        self.sheet = sheet
 
         request = self.sheet.values().get(
             spreadsheetId=self.spreadsheet_id,
-            range=self.sheet_range
+            range=f"'{self.sheet_range}'!A1"
         )
 
         try:
@@ -70,41 +278,285 @@ class GoogleSheetInterface:
             self.valid = False
             self.err = err
 
-    def add_row(self, col: int, row: int, data: list):
-        request = self.sheet
+    def add_row(self, rows: list[list], formulas: bool = False) -> list[int]:
+        """
+            Appends all `rows` after the last row of the sheet with one request. Returns their row numbers.
+            With `formulas`, values are entered as if typed, so "=..." cells become formulas.
+        """
+        if not rows:
+            return []
 
-        try:
-            request.execute()
-        except Exception as err:
-            print("Exception happened in `add_row`")
-            print(f"Trace: {err}")
+        result = self.sheet.values().append(
+            spreadsheetId=self.spreadsheet_id,
+            range=self.__range(1),
+            valueInputOption="USER_ENTERED" if formulas else "RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": [self.__to_cells(row) for row in rows]}
+        ).execute()
+
+        start = self.__first_row(result["updates"]["updatedRange"])
+        row_numbers = list(range(start, start + len(rows)))
+        for row, row_number in zip(rows, row_numbers):
+            self.keys[self.__key(row)] = row_number
+
+        return row_numbers
+
+    def get_row(self, row_numbers: list[int] = None) -> list[list]:
+        """
+            Returns the given rows (all data rows if not given) with one request, padded to the sheet width
+            and with empty cells as None
+        """
+        if row_numbers is None:
+            result = self.sheet.values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=self.__range(self.header_rows + 1, None),
+                valueRenderOption="UNFORMATTED_VALUE"
+            ).execute()
+            return [self.__from_cells(row) for row in result.get("values", []) if row]
+
+        rows = []
+        for chunk in self.__chunks(row_numbers):
+            result = self.sheet.values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[self.__range(row_number) for row_number in chunk],
+                valueRenderOption="UNFORMATTED_VALUE"
+            ).execute()
+            rows += [self.__from_cells(value_range.get("values", [[]])[0]) for value_range in result["valueRanges"]]
+
+        return rows
+
+    def set_row(self, rows: dict[int, list]):
+        """
+            Overwrites rows, given as {row number: values}, batching up to BATCH_SIZE rows per request
+        """
+        row_numbers = list(rows)
+        for chunk in self.__chunks(row_numbers):
+            self.sheet.values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={
+                    "valueInputOption": "RAW",
+                    "data": [{"range": self.__range(row_number), "values": [self.__to_cells(rows[row_number])]}
+                             for row_number in chunk]
+                }
+            ).execute()
+
+        for row_number in row_numbers:
+            self.keys[self.__key(rows[row_number])] = row_number
+
+    def del_row(self, row_numbers: list[int]):
+        """
+            Deletes the given rows, moving the rows below them up so no blank rows are left for append to stop at.
+            Row numbers read before the call are stale afterwards, except those in `keys`, which are renumbered.
+        """
+        row_numbers = sorted(set(row_numbers), reverse=True)  # Bottom up, so the rows left to delete do not move
+        if not row_numbers:
+            return
+
+        sheet_id = self.__get_sheet_id()
+        for chunk in self.__chunks(row_numbers):
+            self.sheet.batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={"requests": [{"deleteDimension": {"range": {
+                    "sheetId": sheet_id, "dimension": "ROWS", "startIndex": row_number - 1, "endIndex": row_number
+                }}} for row_number in chunk]}
+            ).execute()
+
+        deleted, moved = set(row_numbers), sorted(row_numbers)
+        self.keys = {key: row_number - bisect_left(moved, row_number) for key, row_number in self.keys.items()
+                     if row_number not in deleted}
+        self.blank_rows = [row_number - bisect_left(moved, row_number) for row_number in self.blank_rows
+                           if row_number not in deleted]
 
-    def get_row(self):
-        return
+    def purge_table(self):
+        self.sheet.values().clear(
+            spreadsheetId=self.spreadsheet_id,
+            range=self.__range(self.header_rows + 1, None)
+        ).execute()
+        self.keys = {}
+
+    def get_keys(self) -> dict[tuple, int]:
+        """
+            Reads the key columns (the first `key_width`) of every row with one request and returns
+            {key: row number}, ex. {(date, game): row number}. Rows with empty key columns are listed in `blank_rows`.
+        """
+        result = self.sheet.values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"'{self.sheet_range}'!A{self.header_rows + 1}:{self.get_abc_col(self.key_width)}",
+            valueRenderOption="UNFORMATTED_VALUE"
+        ).execute()
+
+        values = result.get("values", [])
+        self.keys = {
+            self.__key(row): row_number
+            for row_number, row in enumerate(values, start=self.header_rows + 1)
+            if len(row) == self.key_width
+        }
+        self.blank_rows = [row_number for row_number, row in enumerate(values, start=self.header_rows + 1) if not row]
+        return self.keys
+
+    def add_sheet(self, sheet_name: str, width: int, key_width: int = 1) -> "GoogleSheetInterface":
+        """
+            Returns an interface to another sheet of the same spreadsheet, sharing this one's credentials.
+            The sheet is created if it does not exist.
+        """
+        other = GoogleSheetInterface(self.spreadsheet_id, sheet_name, width, self.header_rows, key_width, self.sheet)
+        if not other.valid:
+            self.sheet.batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={"requests": [{"addSheet": {"properties": {"title": sheet_name}}}]}
+            ).execute()
+            other = GoogleSheetInterface(self.spreadsheet_id, sheet_name, width, self.header_rows, key_width,
+                                         self.sheet)
+        if self.stats:
+            other.enable_stats(self.stats)
+
+        return other
+
+    def add_col(self, column_name: str):
+        header = self.get_col_names()
+        self.set_col(len(header) + 1, [column_name], 1)
+
+    def get_col(self, col: int, start_row: int = None) -> list:
+        result = self.sheet.values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=self.__col_range(col, start_row),
+            majorDimension="COLUMNS",
+            valueRenderOption="UNFORMATTED_VALUE"
+        ).execute()
+        values = result.get("values", [[]])
 
-    def set_row(self):
-        return
+        return values[0] if values else []
 
-    def del_row(self):
-        return
+    def get_col_names(self) -> list:
+        result = self.sheet.values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"'{self.sheet_range}'!1:1"
+        ).execute()
+        values = result.get("values", [[]])
 
-    def purge_table(self):
-        return
+        return values[0] if values else []
 
-    def add_col(self):
-        return
+    def set_col(self, col: int, values: list, start_row: int = None):
+        self.sheet.values().update(
+            spreadsheetId=self.spreadsheet_id,
+            range=self.__col_range(col, start_row),
+            valueInputOption="RAW",
+            body={"majorDimension": "COLUMNS", "values": [values]}
+        ).execute()
 
-    def get_col(self):
-        return
+    def del_col(self, col: int):
+        self.sheet.values().clear(
+            spreadsheetId=self.spreadsheet_id,
+            range=self.__col_range(col, 1)
+        ).execute()
 
-    def set_col(self):
-        return
+    def set_header(self, columns: tuple):
+        self.sheet.values().update(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"'{self.sheet_range}'!A1:{self.get_abc_col(len(columns))}1",
+            valueInputOption="RAW",
+            body={"values": [list(columns)]}
+        ).execute()
+
+    def import_csv(self, file_path: str, parse=None, chunk_size: int = BATCH_SIZE,
+                   progress=None) -> tuple[int, list[int]]:
+        """
+            Appends the rows of a CSV file (see read_csv_chunks) with one request per `chunk_size` rows.
+            `progress` is called with the number of lines read after each chunk.
+            Returns (rows imported, line numbers rejected by `parse`).
+        """
+        imported, rejected = 0, []
+        for rows, chunk_rejected, lines in read_csv_chunks(file_path, parse, chunk_size):
+            imported += len(self.add_row(rows))
+            rejected += chunk_rejected
+            if progress:
+                progress(lines)
+
+        return imported, rejected
+
+    # Instrumentation
+    def enable_stats(self, stats: QueryStats):
+        """
+            Records the latency and rows of every read and write of this sheet in `stats`, each write as a commit
+        """
+        self.stats = stats
+        QueryStats.attach(self, self.__describers())
+
+    def disable_stats(self):
+        QueryStats.detach(self, self.__describers())
+        self.stats = None
 
-    def del_col(self):
-        return
+    # Helper Functions
+    def __range(self, start_row: int, end_row: int | str = "") -> str:
+        if end_row == "":
+            end_row = start_row
+        return f"'{self.sheet_range}'!A{start_row}:{self.get_abc_col(self.width)}{end_row or ''}"
 
-    def import_csv(self):
-        return
+    def __col_range(self, col: int, start_row: int = None) -> str:
+        column = self.get_abc_col(col)
+        start_row = start_row or self.header_rows + 1
+        return f"'{self.sheet_range}'!{column}{start_row}:{column}"
+
+    @staticmethod
+    def __to_cells(row: list) -> list:
+        return ["" if value is None else value if isinstance(value, (int, float, str)) else str(value)
+                for value in row]
+
+    def __from_cells(self, cells: list) -> list:
+        cells = cells + [""] * (self.width - len(cells))
+        return [None if value == "" else value for value in cells[:self.width]]
+
+    def __key(self, row: list) -> tuple:
+        return (str(row[0]),) + tuple(int(value) for value in row[1:self.key_width])
+
+    def __get_sheet_id(self) -> int:
+        if self.sheet_id is None:
+            result = self.sheet.get(spreadsheetId=self.spreadsheet_id, fields="sheets.properties").execute()
+            self.sheet_id = next(sheet["properties"]["sheetId"] for sheet in result["sheets"]
+                                 if sheet["properties"]["title"] == self.sheet_range)
+        return self.sheet_id
+
+    @staticmethod
+    def __first_row(a1_range: str) -> int:
+        start = a1_range.split("!")[-1].split(":")[0]
+        return int("".join(c for c in start if c.isdigit()))
+
+    @staticmethod
+    def __chunks(values: list) -> list[list]:
+        return [values[i:i + GoogleSheetInterface.BATCH_SIZE]
+                for i in range(0, len(values), GoogleSheetInterface.BATCH_SIZE)]
+
+    def __describers(self) -> dict:
+        """
+            Rows are counted from the positional argument at `argument` (the rows written), or from the result
+        """
+        def describe(name: str, write: bool, argument: int = None):
+            def describer(args: tuple, kwargs: dict, result) -> tuple:
+                counted = result if argument is None else (args[argument] if len(args) > argument else None)
+                return f"sheets.{name} '{self.sheet_range}'", len(counted) if counted else 0, int(write), None
+            return describer
+
+        return {
+            "add_row": describe("add_row", True, 0),
+            "get_row": describe("get_row", False),
+            "set_row": describe("set_row", True, 0),
+            "del_row": describe("del_row", True, 0),
+            "purge_table": describe("purge_table", True),
+            "get_keys": describe("get_keys", False),
+            "get_col": describe("get_col", False),
+            "set_col": describe("set_col", True, 1),
+        }
+
+    @staticmethod
+    def errors() -> tuple:
+        """
+            Exception types raised when a request fails: errors returned by the API and network errors
+        """
+        from google.auth.exceptions import TransportError
+        from googleapiclient.errors import HttpError
+        from httplib2 import HttpLib2Error
+
+        return HttpError, HttpLib2Error, TransportError, OSError
 
     @staticmethod
     def get_abc_col(col: int) -> str:
@@ -120,114 +572,400 @@ class GoogleSheetInterface:
         return output
 
 
-class MariaDBInterface:
-    def __init__(self, user: str, password: str, database: str):
+class MariaDBPool:
+    """
+        Fixed-size pool of MariaDB connections. Connections are pinged on checkout and reconnected if stale, so a
+        dropped server connection does not take the interface down with it. Connections autocommit, so a read never
+        holds a snapshot open and sees what other connections committed; transactions are begun explicitly.
+    """
+    def __init__(self, user: str, password: str, database: str, size: int = 1, host: str = "localhost"):
         self.valid = True
         self.err = None
+        self.size = size
+        self.settings = {"user": user, "password": password, "host": host, "database": database, "autocommit": True}
+        self.connections: Queue = Queue(maxsize=size)
+        self.cursors: dict[int, "mariadb.Cursor"] = {}
 
         try:
-            self.conn = mariadb.connect(
-                user=user,
-                password=password,
-                host="localhost",
-                database=database
-            )
-            self.cursor = self.conn.cursor()
+            for _ in range(size):
+                self.connections.put(mariadb.connect(**self.settings))
         except mariadb.Error as err:
             self.valid = False
             self.err = err
 
+    def checkout(self, timeout: float = None) -> "mariadb.Connection":
+        conn = self.connections.get(timeout=timeout)
+
+        try:
+            conn.ping()
+        except mariadb.Error:
+            self.cursors.pop(id(conn), None)
+            try:
+                conn.reconnect()
+            except mariadb.Error:
+                try:
+                    conn = mariadb.connect(**self.settings)
+                except mariadb.Error:
+                    self.connections.put(conn)
+                    raise
+
+        return conn
+
+    def checkin(self, conn: "mariadb.Connection"):
+        self.connections.put(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.checkout(timeout)
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def cursor(self, conn: "mariadb.Connection") -> "mariadb.Cursor":
+        cursor = self.cursors.get(id(conn))
+        if cursor is None:
+            cursor = conn.cursor(prepared=True)
+            self.cursors[id(conn)] = cursor
+
+        return cursor
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get().close()
+        self.cursors.clear()
+
+
+class StorageInterface(ABC):
+    """
+        Table storage shared by the SQL backends. Statements are built from the shape of each call, cached, and run
+        by the backend through `execute`, `execute_many` and `run_statements`; a backend's `compile` adds the
+        statement kinds its dialect writes differently (UPSERT, UPDATE, DELETE).
+        Search keys ending in a comparison operator (ex. "date>=") compare with it instead of "=", and a None value
+        searches for NULL (or NOT NULL with "!=").
+    """
+    OPERATORS = ("<", ">", "<=", ">=", "!=")
+
+    def __init__(self):
+        self.valid = True
+        self.err = None
+        self.statements: dict[tuple, str] = {}
+        self.stats: QueryStats | None = None
+
+    @staticmethod
+    def errors() -> tuple:
+        """
+            Exception types raised when the database cannot be reached, as opposed to a statement failing. None for
+            an embedded database.
+        """
+        return ()
+
     # Basic Functions
     def add_row(self, table: str, target_keys: tuple, target_values: tuple):
         if len(target_keys) != len(target_values):
             return None
 
-        target_keys, target_values = self.__values_str(target_keys, target_values)
+        statement = self.__statement("INSERT", table, tuple(target_keys))
 
-        self.cursor.execute(
-            f"INSERT INTO {table} {target_keys} VALUES {target_values}"
-        )
-        self.conn.commit()
+        self.execute(statement, tuple(target_values), commit=True)
 
     def get_row(self, table: str, search_keys: tuple = None, search_values: tuple = None,
                 sort_keys: tuple = None, sort_order: tuple = None, num_rows: int = 25):
         if search_keys and search_values and len(search_keys) != len(search_values):
             return None
 
-        if search_keys and search_values and sort_keys:  # get data with search and ordering
-            processed_search = self.__where_str(search_keys, search_values)
-            processed_sort_keys = self.__orderby_str(sort_keys, sort_order)
+        if not search_keys or not search_values:
+            search_keys, search_values = (), ()
+        if sort_keys and not sort_order:
+            sort_order = (False,) * len(sort_keys)
 
-            self.cursor.execute(
-                f"SELECT * FROM {table} WHERE {processed_search} "
-                f"ORDER BY {processed_sort_keys} LIMIT {num_rows}"
-            )
-        elif not search_keys and not search_values and sort_keys:  # get data with ordering
-            processed_sort_keys = self.__orderby_str(sort_keys, sort_order)
+        statement = self.__statement("SELECT", table, (), tuple(search_keys), self.__nulls(search_values),
+                                     tuple(zip(sort_keys, sort_order)) if sort_keys else ())
 
-            self.cursor.execute(
-                f"SELECT * FROM {table} ORDER BY {processed_sort_keys} LIMIT {num_rows}"
-            )
-        elif search_keys and search_values:  # get data with search
-            processed_search = self.__where_str(search_keys, search_values)
+        return self.execute(statement, self.__params(search_values) + (num_rows,), fetch=True)
 
-            self.cursor.execute(
-                f"SELECT * FROM {table} WHERE {processed_search} LIMIT {num_rows}"
-            )
-        else:  # get all data
-            self.cursor.execute(
-                f"SELECT * FROM {table} LIMIT {num_rows}"
-            )
-        return list(self.cursor)
+    def iter_rows(self, table: str, key_columns: tuple = ("date", "game"), search_keys: tuple = None,
+                  search_values: tuple = None, chunk_size: int = 500):
+        """
+            Yields every matching row ordered by `key_columns`, which must be the table's leading (unique) columns.
+            Rows are read in pages of `chunk_size` that resume after the last key seen, so memory use and the cost of
+            each page stay constant however large the table is.
+        """
+        if search_keys and search_values and len(search_keys) != len(search_values):
+            return
+
+        if not search_keys or not search_values:
+            search_keys, search_values = (), ()
+        params = self.__params(search_values)
+        nulls = self.__nulls(search_values)
+
+        statement = self.__statement("PAGE", table, tuple(key_columns), tuple(search_keys), nulls)
+        rows = self.execute(statement, params + (chunk_size,), fetch=True)
+
+        statement = self.__statement("PAGE_AFTER", table, tuple(key_columns), tuple(search_keys), nulls)
+        while rows:
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+
+            last = rows[-1][:len(key_columns)]
+            after = tuple(value for i in range(len(last)) for value in last[:i + 1])
+            rows = self.execute(statement, params + after + (chunk_size,), fetch=True)
+
+    def get_aggregate(self, table: str, expressions: tuple, search_keys: tuple = None, search_values: tuple = None):
+        """
+            Returns one row of aggregate `expressions` (ex. "COUNT(*)", "MAX(f10_s)") computed by the database
+        """
+        if search_keys and search_values and len(search_keys) != len(search_values):
+            return None
+
+        if not search_keys or not search_values:
+            search_keys, search_values = (), ()
+
+        statement = self.__statement("AGGREGATE", table, tuple(expressions), tuple(search_keys),
+                                     self.__nulls(search_values))
+
+        return self.execute(statement, self.__params(search_values), fetch=True)[0]
+
+    def get_grouped(self, table: str, group_by: str, expressions: tuple, search_keys: tuple = None,
+                    search_values: tuple = None) -> list:
+        """
+            Returns (group, *aggregate `expressions`) rows grouped by the `group_by` expression, ordered by group
+        """
+        if search_keys and search_values and len(search_keys) != len(search_values):
+            return None
+
+        if not search_keys or not search_values:
+            search_keys, search_values = (), ()
+
+        statement = self.__statement("GROUP", table, (group_by,) + tuple(expressions), tuple(search_keys),
+                                     self.__nulls(search_values))
+
+        return self.execute(statement, self.__params(search_values), fetch=True)
 
     def set_row(self, table: str, target_keys: tuple, target_values: tuple,
                 search_keys: tuple, search_values: tuple, limit: int = 1):
         if len(target_keys) != len(target_values) or len(search_keys) != len(search_values):
             return None
 
-        processed_input = self.__set_str(target_keys, target_values)
-        processed_search = self.__where_str(search_keys, search_values)
+        statement = self.__statement("UPDATE", table, tuple(target_keys), tuple(search_keys),
+                                     self.__nulls(search_values))
 
-        self.cursor.execute(
-            f"UPDATE {table} SET {processed_input} WHERE {processed_search} LIMIT {limit}"
-        )
-        self.conn.commit()
+        self.execute(statement, tuple(target_values) + self.__params(search_values) + (limit,), commit=True)
 
     def del_row(self, table: str, target_keys: tuple, target_values: tuple, limit: int = 1):
         if len(target_keys) != len(target_values):
             return None
 
-        processed_search = self.__where_str(target_keys, target_values)
-
-        self.cursor.execute(
-            f"DELETE FROM {table} WHERE {processed_search} LIMIT {limit}"
-        )
-        self.conn.commit()
+        statement = self.__statement("DELETE", table, (), tuple(target_keys), self.__nulls(target_values))
+
+        self.execute(statement, self.__params(target_values) + (limit,), commit=True)
+
+    def upsert_rows(self, table: str, target_keys: tuple, rows: list[tuple], update_keys: tuple = ()):
+        """
+            Inserts all `rows` in one transaction, overwriting `update_keys` of rows whose primary key already exists.
+            Without `update_keys` an existing key fails the whole transaction.
+        """
+        if not rows:
+            return
+
+        if update_keys:
+            statement = self.__statement("UPSERT", table, tuple(target_keys), tuple(update_keys))
+        else:
+            statement = self.__statement("INSERT", table, tuple(target_keys))
+
+        self.execute_many(statement, rows)
+
+    def import_csv(self, table: str, file_path: str, target_keys: tuple, update_keys: tuple = None, parse=None,
+                   chunk_size: int = 1000, progress=None) -> tuple[int, list[int]]:
+        """
+            Loads the rows of a CSV file (see read_csv_chunks) into `target_keys` of `table`, one executemany and
+            transaction per `chunk_size` rows. With `update_keys` rows whose primary key exists are overwritten,
+            otherwise they fail the import. `progress` is called with the number of lines read after each chunk.
+            Returns (rows imported, line numbers rejected by `parse`).
+        """
+        imported, rejected = 0, []
+        for rows, chunk_rejected, lines in read_csv_chunks(file_path, parse, chunk_size):
+            self.upsert_rows(table, target_keys, rows, update_keys or ())
+            imported += len(rows)
+            rejected += chunk_rejected
+            if progress:
+                progress(lines)
+
+        return imported, rejected
 
     # Advanced Functions (requires confirmation)
     def purge_table(self, table: str, confirm: bool):
-        self.cursor.execute(
-            f"DELETE FROM {table}"
-        )
-        self.conn.commit()
+        self.execute(f"DELETE FROM {table}", commit=True)
+
+    # Backend Functions
+    @abstractmethod
+    def execute(self, statement: str, values: tuple = (), commit: bool = False, fetch: bool = False):
+        """
+            Runs one statement, committing it if `commit` is set. Returns the rows if `fetch` is set.
+        """
+
+    @abstractmethod
+    def execute_many(self, statement: str, rows: list[tuple]):
+        """
+            Runs `statement` once per row of values as a single transaction
+        """
+
+    @abstractmethod
+    def run_statements(self, statements: list[tuple[str, tuple]]):
+        """
+            Runs prepared (statement, values) pairs in order as a single transaction
+        """
+
+    def close(self):
+        pass
+
+    # Instrumentation
+    def enable_stats(self, stats: QueryStats):
+        """
+            Records the latency, rows and commits of every execute, execute_many and run_statements call in `stats`
+        """
+        self.stats = stats
+        QueryStats.attach(self, self.__describers())
+
+    def disable_stats(self):
+        QueryStats.detach(self, self.__describers())
+        self.stats = None
+
+    def compile(self, kind: str, table: str, target_keys: tuple, search_keys: tuple, where: str, sort: tuple) -> str:
+        """
+            Returns the SQL for a statement shape. `where` is the compiled " WHERE ..." clause of `search_keys`, or "".
+            Values are always bound to the `?` placeholders, never formatted into the statement.
+        """
+        if kind == "INSERT":
+            return f"INSERT INTO {table} ({', '.join(target_keys)}) VALUES ({', '.join('?' * len(target_keys))})"
+        elif kind == "SELECT":
+            order = ", ".join(f"{key} DESC" if descending else key for key, descending in sort)
+            order = f" ORDER BY {order}" if order else ""
+            return f"SELECT * FROM {table}{where}{order} LIMIT ?"
+        elif kind in ("PAGE", "PAGE_AFTER"):
+            if kind == "PAGE_AFTER":
+                after = " OR ".join(
+                    "(" + "".join(f"{key}=? AND " for key in target_keys[:i]) + f"{target_keys[i]}>?)"
+                    for i in range(len(target_keys))
+                )
+                where = f"{where} AND ({after})" if where else f" WHERE ({after})"
+            return f"SELECT * FROM {table}{where} ORDER BY {', '.join(target_keys)} LIMIT ?"
+        elif kind == "GROUP":
+            group = target_keys[0]
+            return f"SELECT {', '.join(target_keys)} FROM {table}{where} GROUP BY {group} ORDER BY {group}"
+        elif kind == "AGGREGATE":
+            return f"SELECT {', '.join(target_keys)} FROM {table}{where}"
+
+        raise InterfaceError(f"Unknown statement type '{kind}'")
 
+    # Helper Functions
+    def __statement(self, kind: str, table: str, target_keys: tuple = (), search_keys: tuple = (),
+                    search_nulls: tuple = (), sort: tuple = ()) -> str:
+        """
+            Returns the parameterized SQL for a statement shape, compiling it on first use
+        """
+        shape = (kind, table, target_keys, search_keys, search_nulls, sort)
+
+        statement = self.statements.get(shape)
+        if statement is None:
+            where = " AND ".join(
+                self.__condition(key, is_null) for key, is_null in zip(search_keys, search_nulls)
+            )
+            statement = self.compile(kind, table, target_keys, search_keys, f" WHERE {where}" if where else "", sort)
+            self.statements[shape] = statement
+
+        return statement
+
+    @staticmethod
+    def __condition(key: str, is_null: bool) -> str:
+        if is_null:
+            return f"{key[:-2]} IS NOT NULL" if key.endswith("!=") else f"{key} IS NULL"
+        elif key.endswith(StorageInterface.OPERATORS):
+            return f"{key}?"
+
+        return f"{key}=?"
+
+    @staticmethod
+    def __nulls(values: tuple) -> tuple:
+        return tuple(value is None for value in values)
+
+    def __describers(self) -> dict:
+        return {
+            "execute": self.__describe_execute,
+            "execute_many": self.__describe_execute_many,
+            "run_statements": self.__describe_run_statements,
+        }
+
+    @staticmethod
+    def __describe_execute(args: tuple, kwargs: dict, result) -> tuple:
+        """
+            Rows are the rows fetched, a commit is counted when requested
+        """
+        statement = args[0] if args else kwargs["statement"]
+        values = args[1] if len(args) > 1 else kwargs.get("values", ())
+        commit = args[2] if len(args) > 2 else kwargs.get("commit", False)
+
+        return statement, len(result) if result is not None else 0, int(bool(commit)), values
+
+    @staticmethod
+    def __describe_execute_many(args: tuple, kwargs: dict, result) -> tuple:
+        statement = args[0] if args else kwargs["statement"]
+        rows = args[1] if len(args) > 1 else kwargs["rows"]
+
+        return statement, len(rows), 1, None
+
+    @staticmethod
+    def __describe_run_statements(args: tuple, kwargs: dict, result) -> tuple:
+        """
+            A batch is recorded under its first statement, rows are the statements run
+        """
+        statements = args[0] if args else kwargs["statements"]
+        if not statements:
+            return "(empty batch)", 0, 1, None
+
+        operation = statements[0][0] + (" (batch)" if len(statements) > 1 else "")
+        return operation, len(statements), 1, statements[0][1]
+
+    @staticmethod
+    def __params(values: tuple) -> tuple:
+        return tuple(value for value in values if value is not None)
+
+
+class MariaDBInterface(StorageInterface):
+    def __init__(self, user: str, password: str, database: str, pool_size: int = 1, pool: MariaDBPool = None):
+        super().__init__()
+
+        self.pool = pool if pool else MariaDBPool(user, password, database, pool_size)
+        if not self.pool.valid:
+            self.valid = False
+            self.err = self.pool.err
+
+    @staticmethod
+    def errors() -> tuple:
+        return mariadb.InterfaceError, mariadb.OperationalError
+
+    def run_statements(self, statements: list[tuple[str, tuple]]):
+        with self.pool.connection() as conn:
+            cursor = self.pool.cursor(conn)
+            try:
+                conn.begin()
+                for statement, values in statements:
+                    cursor.execute(statement, values)
+                conn.commit()
+            except mariadb.Error:
+                conn.rollback()
+                raise
+
+    # Advanced Functions (requires confirmation)
     def add_col(self, table: str, column_name: str, column_type: str):
-        self.cursor.execute(
-            f"ALTER TABLE {table} ADD {column_name} {column_type}"
-        )
-        self.conn.commit()
+        self.execute(f"ALTER TABLE {table} ADD {column_name} {column_type}", commit=True)
 
     def set_col(self, table: str, column_name: str, new_type: str):
-        self.cursor.execute(
-            f"ALTER TABLE {table} MODIFY {column_name} {new_type}"
-        )
-        self.conn.commit()
+        self.execute(f"ALTER TABLE {table} MODIFY {column_name} {new_type}", commit=True)
 
     def del_col(self, table: str, column_name: str):
-        self.cursor.execute(
-            f"ALTER TABLE {table} DROP COLUMN {column_name}"
-        )
-        self.conn.commit()
+        self.execute(f"ALTER TABLE {table} DROP COLUMN {column_name}", commit=True)
 
     # Helper Functions
     @staticmethod
@@ -246,89 +984,287 @@ class MariaDBInterface:
             print("not date")
             return False
 
-    @staticmethod
-    def __values_str(keys: tuple, values: tuple[str]) -> (str, str):
-        output_key = ""
-        output_data = ""
-        for i, key in enumerate(keys):
-            if len(keys) == 1:
-                output_key += f"({key})"
-                break
-            elif i == 0:
-                output_key += "("
-
-            if i == len(keys) - 1:
-                output_key += f"{key})"
-            else:
-                output_key += f"{key}, "
+    def execute(self, statement: str, values: tuple = (), commit: bool = False, fetch: bool = False):
+        with self.pool.connection() as conn:
+            cursor = self.pool.cursor(conn)
+            cursor.execute(statement, values)
+            if commit:
+                conn.commit()
+            if fetch:
+                return cursor.fetchall()
+
+    def execute_many(self, statement: str, rows: list[tuple]):
+        with self.pool.connection() as conn:
+            cursor = self.pool.cursor(conn)
+            try:
+                conn.begin()
+                cursor.executemany(statement, rows)
+                conn.commit()
+            except mariadb.Error:
+                conn.rollback()
+                raise
+
+    def close(self):
+        self.pool.close()
+
+    def compile(self, kind: str, table: str, target_keys: tuple, search_keys: tuple, where: str, sort: tuple) -> str:
+        if kind == "UPSERT":  # search_keys are the columns to update on a duplicate key
+            return (f"INSERT INTO {table} ({', '.join(target_keys)}) VALUES ({', '.join('?' * len(target_keys))}) "
+                    f"ON DUPLICATE KEY UPDATE {', '.join(f'{key}=VALUES({key})' for key in search_keys)}")
+        elif kind == "UPDATE":
+            return f"UPDATE {table} SET {', '.join(f'{key}=?' for key in target_keys)}{where} LIMIT ?"
+        elif kind == "DELETE":
+            return f"DELETE FROM {table}{where} LIMIT ?"
+
+        return super().compile(kind, table, target_keys, search_keys, where, sort)
+
+
+class SQLiteInterface(StorageInterface):
+    """
+        Embedded backend in a single SQLite file, for single-lane installs and for running without a server.
+        Statements written for MariaDB run unchanged: ON DUPLICATE KEY UPDATE is rewritten to SQLite's upsert
+        (SQLite 3.35 or newer) and the MariaDB functions used by the interface are registered on the connection.
+        The connection is shared between threads behind a lock. `schema` statements are run when the file is opened.
+    """
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",  # WAL keeps the file consistent, only the last commits can be lost on power loss
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-16000",  # 16 MB
+        "PRAGMA mmap_size=268435456",  # 256 MB
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, path: str, schema: tuple = ()):
+        super().__init__()
+        self.path = path
+        self.lock = RLock()
+        self.depth = 0  # Nested transaction() blocks, statements commit only outside of one
+        self.translated: dict[str, str] = {}
 
-        for i, value in enumerate(values):
-            if len(values) == 1:
-                if isinstance(value, str):
-                    output_data += f"('{value}')"
-                else:
-                    output_data += f"{value}"
-                break
-            elif i == 0:
-                output_data += "("
-
-            if i == len(values) - 1:
-                if isinstance(value, str):
-                    output_data += f"'{value}')"
-                else:
-                    output_data += f"{value})"
-            else:
-                if isinstance(value, str):
-                    output_data += f"'{value}', "
-                else:
-                    output_data += f"{value}, "
-        return output_key, output_data
+        try:
+            sqlite3.register_adapter(t_date, t_date.isoformat)
+            sqlite3.register_converter("DATE", lambda value: t_date.fromisoformat(value.decode()))
+            sqlite3.register_converter("TIMESTAMP", lambda value: t_datetime.fromisoformat(value.decode()))
+            self.conn = sqlite3.connect(path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+            for pragma in self.PRAGMAS:
+                self.conn.execute(pragma)
+            self.__register_functions()
+
+            for statement in schema:
+                self.conn.execute(statement)
+            self.conn.commit()
+        except sqlite3.Error as err:
+            self.valid = False
+            self.err = err
 
-    @staticmethod
-    def __where_str(keys: tuple, values: tuple) -> str:
-        output = ""
-        for i, (key, value) in enumerate(zip(keys, values)):
-            if i == len(keys) - 1:
-                if value is None:
-                    output += f"{key} IS NULL"
-                elif isinstance(value, str):
-                    output += f"{key}='{value}'"
-                else:
-                    output += f"{key}={value}"
-            else:
-                if value is None:
-                    output += f"{key} IS NULL AND "
-                elif isinstance(value, str):
-                    output += f"{key}='{value}' AND "
-                else:
-                    output += f"{key}={value} AND "
-        return output
+    def run_statements(self, statements: list[tuple[str, tuple]]):
+        with self.transaction():
+            for statement, values in statements:
+                self.conn.execute(self.__translate(statement), values)
+
+    @contextmanager
+    def transaction(self):
+        """
+            Runs the statements of the block as one transaction, committed when the outermost block exits
+        """
+        with self.lock:
+            self.depth += 1
+            try:
+                yield
+                if self.depth == 1:
+                    self.conn.commit()
+            except Exception:
+                if self.depth == 1:
+                    self.conn.rollback()
+                raise
+            finally:
+                self.depth -= 1
+
+    def execute(self, statement: str, values: tuple = (), commit: bool = False, fetch: bool = False):
+        with self.lock:
+            cursor = self.conn.execute(self.__translate(statement), values)
+            if commit and not self.depth:
+                self.conn.commit()
+            if fetch:
+                return cursor.fetchall()
+
+    def execute_many(self, statement: str, rows: list[tuple]):
+        with self.transaction():
+            self.conn.executemany(self.__translate(statement), rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def compile(self, kind: str, table: str, target_keys: tuple, search_keys: tuple, where: str, sort: tuple) -> str:
+        if kind == "UPSERT":  # search_keys are the columns to update on a duplicate key
+            return (f"INSERT INTO {table} ({', '.join(target_keys)}) VALUES ({', '.join('?' * len(target_keys))}) "
+                    f"ON CONFLICT DO UPDATE SET {', '.join(f'{key}=excluded.{key}' for key in search_keys)}")
+        elif kind == "UPDATE":  # No UPDATE/DELETE ... LIMIT in default SQLite builds
+            return (f"UPDATE {table} SET {', '.join(f'{key}=?' for key in target_keys)} "
+                    f"WHERE rowid IN (SELECT rowid FROM {table}{where} LIMIT ?)")
+        elif kind == "DELETE":
+            return f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table}{where} LIMIT ?)"
+
+        return super().compile(kind, table, target_keys, search_keys, where, sort)
 
-    @staticmethod
-    def __set_str(keys: tuple, values: tuple):
-        output = ""
-        for i, (key, value) in enumerate(zip(keys, values)):
-            if i == len(keys) - 1:
-                if isinstance(value, str):
-                    output += f"{key}='{value}'"
-                else:
-                    output += f"{key}={value}"
-            else:
-                if isinstance(value, str):
-                    output += f"{key}='{value}', "
-                else:
-                    output += f"{key}={value}, "
-        return output
+    # Helper Functions
+    def __translate(self, statement: str) -> str:
+        """
+            Rewrites the MariaDB-only syntax of a statement for SQLite, once per distinct statement
+        """
+        translated = self.translated.get(statement)
+        if translated is None:
+            import re
+
+            translated = statement.replace("ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET")
+            translated = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", translated)
+            translated = translated.replace("TIMESTAMPDIFF(SECOND,", "TIMESTAMPDIFF('SECOND',")
+            self.translated[statement] = translated
+
+        return translated
+
+    def __register_functions(self):
+        from datetime import timezone
+
+        def date_format(value, dateformat: str):
+            return None if value is None else t_date.fromisoformat(str(value)[:10]).strftime(dateformat)
+
+        def timestampdiff(unit: str, start, end):
+            if start is None or end is None or unit != "SECOND":
+                return None
+            return int((t_datetime.fromisoformat(str(end)) - t_datetime.fromisoformat(str(start))).total_seconds())
+
+        self.conn.create_function("DATE_FORMAT", 2, date_format, deterministic=True)
+        self.conn.create_function("TIMESTAMPDIFF", 3, timestampdiff, deterministic=True)
+        # Same format and time zone (UTC) as SQLite's CURRENT_TIMESTAMP
+        self.conn.create_function("NOW", 0, lambda: t_datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+
+
+class OfflineInterface(SQLiteInterface):
+    """
+        Local stand-in for the database while the server is unreachable: an SQLite file holding a snapshot of the
+        `data` table. Every change to `data` is applied to the snapshot and the resulting row (or its deletion)
+        appended to `journal` in the same transaction, with whether it inserted, updated or deleted the row, to be
+        replayed once the server is back.
+    """
+    def __init__(self, path: str, columns: tuple, schema: tuple = (), key_columns: tuple = ("date", "game")):
+        super().__init__(path, tuple(schema) + (
+            "CREATE TABLE IF NOT EXISTS journal (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "date TEXT NOT NULL, game INTEGER NOT NULL, row TEXT, kind TEXT NOT NULL DEFAULT 'update')",
+        ))
+        self.columns = columns
+        self.key_columns = key_columns
+
+        # Journals written before `kind` was recorded replay as updates, as they did then
+        if self.valid and "kind" not in {column[1] for column in self.execute("PRAGMA table_info(journal)",
+                                                                             fetch=True)}:
+            self.execute("ALTER TABLE journal ADD COLUMN kind TEXT NOT NULL DEFAULT 'update'", commit=True)
 
-    @staticmethod
-    def __orderby_str(keys: tuple, order: tuple) -> str:
-        output = ""
-        for i, (_key, _order) in enumerate(zip(keys, order)):
-            if i == len(keys) - 1:
-                output += f"{_key} {'DESC' if _order else ''}"
+    # Basic Functions
+    def add_row(self, table: str, target_keys: tuple, target_values: tuple):
+        if len(target_keys) != len(target_values):
+            return None
+
+        with self.transaction():
+            super().add_row(table, target_keys, target_values)
+            row = dict(zip(target_keys, target_values))
+            self.__journal(table, self.key_columns, tuple(row.get(key) for key in self.key_columns), "insert")
+
+    def set_row(self, table: str, target_keys: tuple, target_values: tuple,
+                search_keys: tuple, search_values: tuple, limit: int = 1):
+        if len(target_keys) != len(target_values) or len(search_keys) != len(search_values):
+            return None
+
+        with self.transaction():
+            super().set_row(table, target_keys, target_values, search_keys, search_values, limit)
+            self.__journal(table, search_keys, search_values, "update")
+
+    def del_row(self, table: str, target_keys: tuple, target_values: tuple, limit: int = 1):
+        if len(target_keys) != len(target_values):
+            return None
+
+        with self.transaction():
+            self.__journal(table, target_keys, target_values, "delete")
+            super().del_row(table, target_keys, target_values, limit)
+
+    # Journal Functions
+    def get_journal(self) -> tuple[int, list[tuple], list[tuple], list[tuple]]:
+        """
+            Returns (last sequence number, rows created offline, rows of games changed offline, (date, game) keys of
+            games deleted offline), keeping only the last change to each game. A game created offline is new to the
+            server even if it was changed afterwards, and one created and deleted offline is left out.
+        """
+        first, latest = {}, {}
+        last_seq = 0
+        for seq, date, game, row, kind in self.execute("SELECT seq, date, game, row, kind FROM journal ORDER BY seq",
+                                                       fetch=True):
+            first.setdefault((date, game), kind)
+            latest[(date, game)] = tuple(json.loads(row)) if row else None
+            last_seq = seq
+
+        new = [row for key, row in latest.items() if row and first[key] == "insert"]
+        changed = [row for key, row in latest.items() if row and first[key] != "insert"]
+        deleted = [key for key, row in latest.items() if not row and first[key] != "insert"]
+        return last_seq, new, changed, deleted
+
+    def clear_journal(self, last_seq: int):
+        self.execute("DELETE FROM journal WHERE seq<=?", (last_seq,), commit=True)
+
+    def restore_row(self, table: str, target_keys: tuple, target_values: tuple):
+        """
+            Inserts a row that the server has but the snapshot, taken before it was written, does not. Journaled as
+            an update, so the replay overwrites the server's copy instead of saving it again under a new number.
+        """
+        with self.transaction():
+            super().add_row(table, target_keys, target_values)
+            row = dict(zip(target_keys, target_values))
+            self.__journal(table, self.key_columns, tuple(row.get(key) for key in self.key_columns), "update")
+
+    def load_snapshot(self, rows, start: t_date = None, end: t_date = None) -> int:
+        """
+            Replaces the snapshot's rows with `start` <= date < `end` (every row if not given) with `rows` in one
+            transaction. Refused while changes are waiting in the journal.
+        """
+        if self.get_aggregate("journal", ("COUNT(*)",))[0]:
+            return 0
+
+        count = 0
+        with self.transaction():
+            if start:
+                self.execute("DELETE FROM data WHERE date>=? AND date<?", (start, end))
             else:
-                output += f"{_key} {'DESC' if _order else ''}, "
-        return output
+                self.execute("DELETE FROM data")
+            for chunk in iter(lambda: list(islice(rows, 1000)), []):
+                self.upsert_rows("data", self.columns, chunk)
+                count += len(chunk)
+
+        return count
+
+    # Helper Functions
+    def __journal(self, table: str, keys: tuple, values: tuple, kind: str):
+        if table != "data":
+            return
+
+        for row in self.get_row("data", keys, values, num_rows=-1):
+            self.execute("INSERT INTO journal (date, game, row, kind) VALUES (?, ?, ?, ?)",
+                         (row[0], row[1], None if kind == "delete" else json.dumps(row, default=str), kind))
+
+
+# Database backends selectable with STORAGE_BACKEND. Google Sheets is the backup and the offline interface is
+# entered through Interface.go_offline, neither takes a database's configuration.
+BACKENDS = {
+    "mariadb": MariaDBInterface,
+    "sqlite": SQLiteInterface,
+}
+
+
+def get_backend(name: str) -> type:
+    if name not in BACKENDS:
+        raise InterfaceError(f"Unknown storage backend '{name}', expected one of: {', '.join(BACKENDS)}")
+
+    return BACKENDS[name]
 
 
 class InterfaceError(Exception):
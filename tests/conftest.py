@@ -0,0 +1,37 @@
+"""
+
+conftest.py
+Written by: William Lin
+
+Description:
+Shared pytest fixtures. Tests run against the embedded SQLite backend, so no server is needed.
+
+"""
+
+import sys
+from os.path import abspath
+from os.path import dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import pytest
+
+from benchmark import GameGenerator
+from bowling import Interface
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / "bowling.db")
+
+
+@pytest.fixture
+def instance(db_path):
+    instance = Interface("", "", db_path, "", "", backend="sqlite")
+    yield instance
+    instance.close()
+
+
+@pytest.fixture
+def generator() -> GameGenerator:
+    return GameGenerator(7)
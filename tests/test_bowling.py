@@ -0,0 +1,122 @@
+"""
+
+test_bowling.py
+Written by: William Lin
+
+Description:
+Tests for game sessions, scoring and the statistics summary tables
+
+"""
+
+from datetime import date as t_date
+from datetime import timedelta
+
+import pytest
+
+from bowling import GameSession
+from bowling import GameUtils
+from bowling import Interface
+from bowlingstats import Statistics
+
+
+def full_scores(throws: list[int | None]) -> list[int]:
+    return GameUtils.accumulate_scores(GameUtils.calc_frame_scores([throw or 0 for throw in throws]))
+
+
+def session_frame(throws: list[int | None], frame: int) -> list[int | None]:
+    start = GameSession.frame_index(frame)
+    return throws[start:start + 2]
+
+
+def play(session: GameSession, throws: list[int | None]) -> list[int]:
+    for frame in range(1, 10):
+        session.add_frame(frame, [throw for throw in session_frame(throws, frame) if throw is not None])
+    session.add_frame(10, [throw for throw in throws[18:] if throw is not None])
+    return session.finish()
+
+
+def test_session_saves_game_with_one_write(instance, generator):
+    throws = generator.throws()
+    session = instance.new_session("2024-01-05")
+
+    scores = play(session, throws)
+
+    game, = instance.get_game("2024-01-05", 1)
+    assert game.throws == throws
+    assert game.scores == scores == full_scores(throws)
+
+
+def test_session_checkpoints_partial_game(instance, generator):
+    throws = generator.throws()
+    session = instance.new_session("2024-01-05", checkpoint=3)
+
+    for frame in range(1, 4):
+        session.add_frame(frame, [throw for throw in session_frame(throws, frame) if throw is not None])
+    partial, = instance.get_game("2024-01-05", 1)
+    assert partial.throws[:6] == throws[:6]
+    assert partial.scores == [None] * 10
+
+    session.discard()
+    assert instance.get_game("2024-01-05", 1) == []
+
+
+def test_session_renumbers_game_taken_by_another_client(instance, db_path, generator):
+    other = Interface("", "", db_path, "", "", backend="sqlite")
+    session = instance.new_session("2024-01-05")
+    assert session.game == 1
+
+    theirs = generator.throws()
+    other.save_game("2024-01-05", 1, theirs, full_scores(theirs))
+    play(session, generator.throws())
+
+    assert session.game == 2
+    assert instance.get_game("2024-01-05", 1)[0].throws == theirs
+    assert [game.game for game in instance.get_game("2024-01-05")] == [1, 2]
+    other.close()
+
+
+def test_rescore_frames_matches_full_rescore(generator):
+    for _ in range(200):
+        throws, replacement = generator.throws(), generator.throws()
+        scores = full_scores(throws)
+        for frame in range(1, 11):
+            start = GameSession.frame_index(frame)
+            end = start + (3 if frame == 10 else 2)
+            modified = throws[:start] + replacement[start:end] + throws[end:]
+
+            rescored = list(scores)
+            for number, score in GameUtils.rescore_frames(modified, scores, frame).items():
+                rescored[number - 1] = score
+
+            assert rescored == full_scores(modified)
+
+
+def test_calc_frame_scores_batch_matches_scalar(generator):
+    games = [generator.throws() for _ in range(500)]
+
+    batch = GameUtils.calc_frame_scores_batch(games)
+
+    assert batch.tolist() == [GameUtils.calc_frame_scores([throw or 0 for throw in throws]) for throws in games]
+    assert GameUtils.accumulate_scores_batch(batch).tolist() == [full_scores(throws) for throws in games]
+
+
+def test_summary_tables_match_full_scan(instance, generator):
+    day = t_date(2023, 12, 20)
+    for i in range(60):
+        throws = generator.throws()
+        instance.save_game(str(day + timedelta(days=i // 3)), i % 3 + 1, throws, full_scores(throws))
+
+    stored, = instance.get_game("2024-01-02", 2)
+    instance.update_frame("2024-01-02", 2, 4, [10, None], stored)
+    instance.delete_game("2024-01-03", 1)
+    instance.save_game("2024-01-04", 4, generator.throws())  # Incomplete games are left out of both
+
+    windows = [Statistics.window(name, t_date(2024, 1, 2)) for name in ("overall", "year", "month", "week")]
+    windows += [(t_date(2023, 12, 25), t_date(2024, 1, 3)), (t_date(2024, 1, 1), None)]
+    for start, end in windows:
+        assert Statistics.get_stats(instance.interface, start, end) == \
+               pytest.approx(Statistics.get_stats(instance.interface, start, end, summary=False))
+
+    instance.rebuild_summary()
+    assert Statistics.get_stats(instance.interface) == \
+           pytest.approx(Statistics.get_stats(instance.interface, summary=False))
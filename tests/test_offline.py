@@ -0,0 +1,70 @@
+"""
+
+test_offline.py
+Written by: William Lin
+
+Description:
+Tests for offline mode: the snapshot, the journal and its replay by go_online
+
+"""
+
+from bowling import Interface
+from bowling import GameUtils
+
+
+def full_scores(throws: list[int | None]) -> list[int]:
+    return GameUtils.accumulate_scores(GameUtils.calc_frame_scores([throw or 0 for throw in throws]))
+
+
+def save(instance: Interface, date: str, game: int, throws: list[int | None]):
+    instance.save_game(date, game, throws, full_scores(throws))
+
+
+def test_replay_renumbers_games_taken_on_server(instance, db_path, tmp_path, generator):
+    first, changed, offline, theirs = (generator.throws() for _ in range(4))
+    save(instance, "2024-02-01", 1, first)
+    assert instance.save_snapshot(str(tmp_path / "offline.db")) == 1
+    assert instance.go_offline(str(tmp_path / "offline.db"))
+
+    assert instance.next_game("2024-02-01") == 2
+    save(instance, "2024-02-01", 2, offline)
+    instance.save_game("2024-02-01", 1, changed, full_scores(changed), exists=True)
+
+    other = Interface("", "", db_path, "", "", backend="sqlite")
+    save(other, "2024-02-01", 2, theirs)
+    other.close()
+
+    assert instance.go_online() == 2
+    assert not instance.offline
+    assert instance.renumbered == [("2024-02-01", 2, 3)]
+    assert [game.throws for game in instance.get_game("2024-02-01")] == [changed, theirs, offline]
+
+
+def test_replay_applies_deletes_and_clears_journal(instance, tmp_path, generator):
+    for game in (1, 2, 3):
+        save(instance, "2024-02-01", game, generator.throws())
+    instance.save_snapshot(str(tmp_path / "offline.db"))
+    instance.go_offline(str(tmp_path / "offline.db"))
+
+    instance.delete_game("2024-02-01", 2)
+    save(instance, "2024-02-02", 1, generator.throws())
+    instance.delete_game("2024-02-02", 1)  # Created and deleted offline, never reaches the server
+
+    assert instance.go_online() == 1
+    assert [game.game for game in instance.get_game("2024-02-01")] == [1, 3]
+    assert instance.get_game("2024-02-02") == []
+
+    instance.go_offline(str(tmp_path / "offline.db"))
+    assert instance.interface.get_journal()[1:] == ([], [], [])
+
+
+def test_snapshot_copies_only_changed_months(instance, tmp_path, generator):
+    path = str(tmp_path / "offline.db")
+    for date in ("2024-01-10", "2024-02-10", "2024-03-10"):
+        save(instance, date, 1, generator.throws())
+
+    assert instance.save_snapshot(path) == 3
+    assert instance.save_snapshot(path) == 0
+
+    save(instance, "2024-02-10", 2, generator.throws())
+    assert instance.save_snapshot(path) == 2
@@ -0,0 +1,73 @@
+"""
+
+test_setup.py
+Written by: William Lin
+
+Description:
+Tests for the schema migrations run by setup.py. The migrations themselves are MariaDB SQL, so they are replaced by
+recording stand-ins and only the bookkeeping runs, against SQLite.
+
+"""
+
+import pytest
+
+import setup
+from storageinterface import InterfaceError
+from storageinterface import SQLiteInterface
+
+
+@pytest.fixture
+def interface(db_path):
+    interface = SQLiteInterface(db_path)
+    yield interface
+    interface.close()
+
+
+def recording(applied: list, count: int, fail: int = None) -> tuple:
+    def migration(number: int):
+        def run(interface, database: str):
+            if number == fail:
+                raise InterfaceError(f"Migration {number} failed")
+            applied.append(number)
+        return run
+
+    return tuple((number, f"Migration {number}", migration(number)) for number in range(1, count + 1))
+
+
+def test_migrations_are_numbered_in_order():
+    assert [number for number, _, _ in setup.MIGRATIONS] == list(range(1, len(setup.MIGRATIONS) + 1))
+
+
+def test_bootstrap_applies_migrations_in_order_once(interface, monkeypatch):
+    applied = []
+    monkeypatch.setattr(setup, "MIGRATIONS", recording(applied, 3))
+
+    assert setup.bootstrap(interface, "bowling") == [1, 2, 3]
+    assert applied == [1, 2, 3]
+    assert setup.get_version(interface) == 3
+
+    assert setup.bootstrap(interface, "bowling") == []
+    assert applied == [1, 2, 3]
+
+
+def test_bootstrap_applies_only_new_migrations(interface, monkeypatch):
+    applied = []
+    monkeypatch.setattr(setup, "MIGRATIONS", recording(applied, 2))
+    setup.bootstrap(interface, "bowling")
+
+    monkeypatch.setattr(setup, "MIGRATIONS", recording(applied, 4))
+    assert setup.bootstrap(interface, "bowling") == [3, 4]
+    assert applied == [1, 2, 3, 4]
+
+
+def test_bootstrap_stops_at_failed_migration(interface, monkeypatch):
+    applied = []
+    monkeypatch.setattr(setup, "MIGRATIONS", recording(applied, 4, fail=3))
+
+    with pytest.raises(InterfaceError):
+        setup.bootstrap(interface, "bowling")
+    assert applied == [1, 2]
+    assert setup.get_version(interface) == 2
+
+    monkeypatch.setattr(setup, "MIGRATIONS", recording(applied, 4))
+    assert setup.bootstrap(interface, "bowling") == [3, 4]
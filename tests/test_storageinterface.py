@@ -0,0 +1,63 @@
+"""
+
+test_storageinterface.py
+Written by: William Lin
+
+Description:
+Tests for the storage layer: paged reads and streaming CSV import
+
+"""
+
+import csv
+from datetime import date as t_date
+
+import pytest
+
+import bowling
+from bowling import DATA_COLUMNS
+from bowling import THROW_COLUMNS
+from bowling import SCORE_COLUMNS
+
+
+@pytest.mark.parametrize("count, chunk_size", [(23, 5), (24, 6), (24, 4), (3, 10), (0, 5)])
+def test_iter_rows_pages_across_chunk_boundaries(instance, generator, count, chunk_size):
+    rows = list(generator.rows(count, t_date(2024, 1, 1), games_per_day=4))
+    instance.interface.upsert_rows("data", DATA_COLUMNS, rows, THROW_COLUMNS + SCORE_COLUMNS)
+
+    paged = list(instance.interface.iter_rows("data", ("date", "game"), chunk_size=chunk_size))
+
+    assert [tuple(row) for row in paged] == rows
+
+
+def test_iter_rows_pages_with_search(instance, generator):
+    rows = list(generator.rows(40, t_date(2024, 1, 1), games_per_day=3))
+    instance.interface.upsert_rows("data", DATA_COLUMNS, rows, THROW_COLUMNS + SCORE_COLUMNS)
+
+    paged = list(instance.interface.iter_rows("data", ("date", "game"), ("date>=", "date<="),
+                                              (t_date(2024, 1, 3), t_date(2024, 1, 9)), chunk_size=4))
+
+    assert [tuple(row) for row in paged] == [row for row in rows if t_date(2024, 1, 3) <= row[0] <= t_date(2024, 1, 9)]
+
+
+def test_import_csv_rejects_invalid_lines(instance, generator, tmp_path, monkeypatch):
+    monkeypatch.setattr(bowling, "IMPORT_CHUNK_SIZE", 4)
+    rows = list(generator.rows(10, t_date(2024, 3, 1), games_per_day=5))
+    lines = [["" if value is None else str(value) for value in row[:23]] for row in rows]
+    lines.insert(2, ["not a date", "1"] + lines[0][2:])
+    lines.insert(5, lines[0][:2] + ["11"] + lines[0][3:])  # More than ten pins
+    lines.insert(7, lines[0][:10])  # Too few throws
+    lines.append(["2024-03-09", "1"] + ["x"] * 21)
+
+    path = tmp_path / "games.csv"
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(DATA_COLUMNS[:23])
+        writer.writerows(lines)
+
+    progress = []
+    imported, rejected = instance.import_csv(str(path), progress.append)
+
+    assert imported == len(rows)
+    assert rejected == [4, 7, 9, 15]  # 1-based, counting the header
+    assert progress == [5, 9, 13, 15]
+    assert [game.to_row() for game in instance.iter_games()] == rows